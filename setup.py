@@ -12,8 +12,15 @@ setup(
     include_package_data=True,
     packages=find_packages("src"),
     package_dir={"": "src"},
-    entry_points={ "console_scripts": ["chessy = chess_box.ui:main"], },
+    entry_points={ "console_scripts": [
+        "chessy = chess_box.ui:main",
+        "chessy-perft = chess_box.perft:main",
+        "chessy-search = chess_box.engine:main",
+        "chessy-uci = chess_box.uci:main",
+        "chessy-tablebase = chess_box.tablebase:main",
+        ], },
     install_requires=[ "pygame", ],
+    extras_require={ "batch": [ "numpy", ], },
 )
 
 
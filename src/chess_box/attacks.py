@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+""" precomputed attack tables
+
+Knight, king and pawn attacks and the between/line masks are small and are built at
+import. Rook and bishop attacks are looked up with magic bitboards; their shared table
+(~840KB) is built once, written to a cache file and memory-mapped on later imports.
+"""
+
+import array
+import mmap
+import os
+import sys
+import zlib
+
+from chess_box.cache import cache_dir
+
+FULL_MASK = 0xffffffffffffffff
+
+def _get_steps(deltas):
+    table = []
+    for bit in range(64):
+        x, y = bit % 8, bit // 8
+        mask = 0
+        for dx, dy in deltas:
+            if 0 <= x + dx < 8 and 0 <= y + dy < 8:
+                mask |= 1 << ((y + dy) * 8 + x + dx)
+        table.append(mask)
+    return tuple(table)
+KNIGHT_ATTACKS = _get_steps(((1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2)))
+KING_ATTACKS = _get_steps(((1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)))
+# indexed by int(color): squares attacked by a pawn of that color
+PAWN_ATTACKS = (_get_steps(((-1, -1), (1, -1))), _get_steps(((-1, 1), (1, 1))))
+
+ROOK_DIRS = ((0, -1), (1, 0), (0, 1), (-1, 0))
+BISHOP_DIRS = ((1, -1), (1, 1), (-1, 1), (-1, -1))
+
+def _get_ray(bit, dx, dy):
+    x, y = bit % 8 + dx, bit // 8 + dy
+    ray = []
+    while 0 <= x < 8 and 0 <= y < 8:
+        ray.append(y * 8 + x)
+        x += dx
+        y += dy
+    return tuple(ray)
+
+def _get_rays(dirs):
+    return tuple(tuple(ray for ray in (_get_ray(bit, dx, dy) for dx, dy in dirs) if ray)
+            for bit in range(64))
+ROOK_RAYS = _get_rays(ROOK_DIRS)
+BISHOP_RAYS = _get_rays(BISHOP_DIRS)
+
+def slide(rays, occ):
+    """ squares reachable along `rays` stopping at (and including) the first blocker in `occ` """
+    mask = 0
+    for ray in rays:
+        for bit in ray:
+            mask |= 1 << bit
+            if (occ >> bit) & 1:
+                break
+    return mask
+
+def _get_lines():
+    between = [[0] * 64 for bit in range(64)]
+    line = [[0] * 64 for bit in range(64)]
+    for bit in range(64):
+        for dx, dy in ROOK_DIRS + BISHOP_DIRS:
+            ray = _get_ray(bit, dx, dy)
+            full = 1 << bit
+            for other in ray + _get_ray(bit, -dx, -dy):
+                full |= 1 << other
+            mask = 0
+            for other in ray:
+                between[bit][other] = mask
+                line[bit][other] = full
+                mask |= 1 << other
+    return tuple(map(tuple, between)), tuple(map(tuple, line))
+# BETWEEN[a][b]: squares strictly between a and b; LINE[a][b]: the whole line through both (0 if unaligned)
+BETWEEN, LINE = _get_lines()
+
+# ---------------------------------------------------------------------------------------------
+# magic bitboards
+# ---------------------------------------------------------------------------------------------
+# found with find_magic() (random.Random(1)); changing them invalidates the cache file name
+ROOK_MAGICS = (
+        0x128012c0008000e0, 0x0240002000401001, 0x4100200041001008, 0x8280100008018004,
+        0x2080080002040080, 0x1300010004008208, 0x04000208a9101408, 0x020000204a018f04,
+        0x1080800040008020, 0x0000c01000402001, 0x0080808010002000, 0x0408800800801000,
+        0x0010800801040080, 0x4804800400804200, 0x0304800d00800200, 0x010200040081006a,
+        0x8280044020084000, 0x042000c010004021, 0x2010002004080020, 0x0040210010000900,
+        0x0008004004020041, 0x0004008080040200, 0x1c20040070610208, 0x1020a20000508104,
+        0x0100c00380008120, 0x4001200280400080, 0x0200100080200080, 0x0000401200082200,
+        0xc02c080080040080, 0x0840040080020080, 0x2102004040800100, 0x0042079a00004104,
+        0x0000400424800280, 0x4820100020400040, 0x5010002000801880, 0x9061080081801002,
+        0x208a050011000800, 0x000200080e003094, 0xa010018204003008, 0x2000288042001401,
+        0x400181c000228000, 0x0200402010004000, 0x8388928600420021, 0x400021001001000a,
+        0x2100080011010004, 0x1002020004008080, 0x0802000804020001, 0x88004410408a0001,
+        0x010508c030800100, 0x4000400080310100, 0x0030200010048080, 0x2000800800100080,
+        0x0100040008008080, 0x0022000204008080, 0x0108020170284400, 0x1001010084004200,
+        0x0004890141902202, 0x0100881100220042, 0x0100102001000841, 0x4408050020081001,
+        0x0002008884201002, 0x2002000490410802, 0x0020014800900204, 0x0100082081044402,
+        )
+BISHOP_MAGICS = (
+        0x0010104088840042, 0x0110104081004062, 0x0091142082000100, 0x0108208821008100,
+        0x0101104000080000, 0x010104200404001c, 0x0c01040202c00010, 0x0001004800841080,
+        0xca8b46100e280102, 0x001010d00085024c, 0x4180089881020120, 0x8010082050411000,
+        0x0800020210100000, 0x0002120905201200, 0xc000040404040510, 0x0110410101100200,
+        0x0042201408020c27, 0xa882000404440c20, 0x0002000102040100, 0x800200202202c200,
+        0x4002005012101401, 0x2441014880600200, 0x0214020104018400, 0x000180004414410a,
+        0x0105410c10020800, 0x0004200084013400, 0x200582045004001b, 0x1000404004010200,
+        0x0001001081004021, 0x2400430202008628, 0x000604c144230800, 0x04004840008a1804,
+        0x4010045000220210, 0x2012100400500120, 0x10001c0205900081, 0x0020880800360a00,
+        0x8500460020060080, 0x0420008209010110, 0x0010020250008c00, 0x8010a40100004104,
+        0x00008208400022c8, 0x0008410450402100, 0x0008920110004104, 0x43a8011044002024,
+        0x0029102021900602, 0x2270101000212040, 0x0020c41112004040, 0x3004840550c42200,
+        0x5002022202404480, 0x0402822309200840, 0x0032010423240048, 0x2000ca0384110008,
+        0x4001140410440000, 0x2092e50810011010, 0x0140040852005041, 0x00200200c1010104,
+        0x40120202020104e0, 0xa000010042300500, 0x400048004a009001, 0x4200800400411081,
+        0x0010040604105400, 0x0107004210024080, 0x0004423004210040, 0xc220023088010040,
+        )
+
+def _get_relevant(rays):
+    # edge squares never change the attack set, so they are left out of the index
+    return tuple(sum(1 << bit for ray in square_rays for bit in ray[:-1]) for square_rays in rays)
+ROOK_RELEVANT = _get_relevant(ROOK_RAYS)
+BISHOP_RELEVANT = _get_relevant(BISHOP_RAYS)
+ROOK_SHIFTS = tuple(64 - bin(mask).count("1") for mask in ROOK_RELEVANT)
+BISHOP_SHIFTS = tuple(64 - bin(mask).count("1") for mask in BISHOP_RELEVANT)
+
+def _get_offsets(shifts, start):
+    offsets = []
+    for shift in shifts:
+        offsets.append(start)
+        start += 1 << (64 - shift)
+    return tuple(offsets), start
+# rook entries first, then bishop entries, in one table
+ROOK_OFFSETS, _ROOK_END = _get_offsets(ROOK_SHIFTS, 0)
+BISHOP_OFFSETS, TABLE_SIZE = _get_offsets(BISHOP_SHIFTS, _ROOK_END)
+
+def _subsets(mask):
+    """ every subset of `mask` (carry-rippler) """
+    sub = 0
+    while True:
+        yield sub
+        sub = (sub - mask) & mask
+        if not sub:
+            return
+
+def find_magic(bit, rays, rng):
+    """ search for a magic multiplier for `bit` (used to generate the constants above) """
+    mask = _get_relevant((rays[bit],))[0]
+    shift = 64 - bin(mask).count("1")
+    occs = tuple(_subsets(mask))
+    attacks = tuple(slide(rays[bit], occ) for occ in occs)
+    while True:
+        magic = rng.getrandbits(64) & rng.getrandbits(64) & rng.getrandbits(64)
+        if bin((mask * magic) & 0xff00000000000000).count("1") < 6:
+            continue
+        used = {}
+        for occ, att in zip(occs, attacks):
+            index = ((occ * magic) & FULL_MASK) >> shift
+            if used.setdefault(index, att) != att:
+                break
+        else:
+            return magic
+
+def _build_table():
+    table = array.array("Q", bytes(8 * TABLE_SIZE))
+    for rays, relevant, magics, shifts, offsets in (
+            (ROOK_RAYS, ROOK_RELEVANT, ROOK_MAGICS, ROOK_SHIFTS, ROOK_OFFSETS),
+            (BISHOP_RAYS, BISHOP_RELEVANT, BISHOP_MAGICS, BISHOP_SHIFTS, BISHOP_OFFSETS)):
+        for bit in range(64):
+            magic, shift, offset = magics[bit], shifts[bit], offsets[bit]
+            for occ in _subsets(relevant[bit]):
+                table[offset + (((occ * magic) & FULL_MASK) >> shift)] = slide(rays[bit], occ)
+    return table
+
+def cache_path():
+    """ slider table cache file in cache_dir() """
+    key = zlib.crc32(repr((ROOK_MAGICS, BISHOP_MAGICS)).encode())
+    return cache_dir() / "sliders-{:08x}-{}.bin".format(key, sys.byteorder)
+
+def _load_table():
+    path = cache_path()
+    try:
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(mm) == 8 * TABLE_SIZE:
+            return memoryview(mm).cast("Q")
+        mm.close()
+    except (OSError, ValueError):
+        pass
+    table = _build_table()
+    # best effort: a read-only or missing cache directory only costs the rebuild next time
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name("{}.{}.tmp".format(path.name, os.getpid()))
+        with open(tmp, "wb") as f:
+            table.tofile(f)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+    return memoryview(table)
+SLIDER_TABLE = _load_table()
+
+def rook_attacks(bit, occ):
+    return SLIDER_TABLE[ROOK_OFFSETS[bit]
+            + ((((occ & ROOK_RELEVANT[bit]) * ROOK_MAGICS[bit]) & FULL_MASK) >> ROOK_SHIFTS[bit])]
+
+def bishop_attacks(bit, occ):
+    return SLIDER_TABLE[BISHOP_OFFSETS[bit]
+            + ((((occ & BISHOP_RELEVANT[bit]) * BISHOP_MAGICS[bit]) & FULL_MASK) >> BISHOP_SHIFTS[bit])]
+
+def queen_attacks(bit, occ):
+    return rook_attacks(bit, occ) | bishop_attacks(bit, occ)
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+""" NumPy-backed batches of positions for vectorized analysis
+
+A BoardBatch holds N positions as parallel uint64 arrays (one row per Board.masks index,
+exposed per Board.bbs key) plus turn, castling and en passant arrays. Attack maps, pseudo-legal
+target masks and check flags are computed for the whole batch at once with set-wise shifts and
+Kogge-Stone fills, so there is no per-position Python loop.
+
+numpy is an optional dependency (`pip install .[batch]`); chess.BoardBatch imports this module lazily.
+"""
+
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImportError("BoardBatch needs numpy (pip install .[batch])") from e
+
+from chess_box import chess
+from chess_box.chess import LIGHT, DARK, KING, QUEEN, ROOK, BISHOP, KNIGHT, PAWN, ALL, BBS_INDICES, RANK_MASKS
+
+U64 = np.uint64
+FILE_A = U64(0x0101010101010101)
+FILE_B = FILE_A << U64(1)
+FILE_G = FILE_A << U64(6)
+FILE_H = FILE_A << U64(7)
+NOT_A = ~FILE_A
+NOT_H = ~FILE_H
+NOT_AB = ~(FILE_A | FILE_B)
+NOT_GH = ~(FILE_G | FILE_H)
+FULL = U64(0xFFFFFFFFFFFFFFFF)
+# bit 0 is a8 and bit 63 is h1: shifting left by 8 moves toward rank 1, by 1 toward the h-file
+# (shift, mask of squares a step can land on without wrapping around the board)
+ROOK_STEPS = ((1, NOT_A), (-1, NOT_H), (8, FULL), (-8, FULL))
+BISHOP_STEPS = ((9, NOT_A), (7, NOT_H), (-7, NOT_A), (-9, NOT_H))
+KNIGHT_STEPS = ((17, NOT_A), (15, NOT_H), (10, NOT_AB), (6, NOT_GH),
+        (-15, NOT_A), (-17, NOT_H), (-6, NOT_AB), (-10, NOT_GH))
+KING_STEPS = ROOK_STEPS + BISHOP_STEPS
+
+def _shift(masks, n):
+    return masks << U64(n) if n > 0 else masks >> U64(-n)
+
+def _steps(masks, steps):
+    out = np.zeros_like(masks)
+    for n, land in steps:
+        out |= _shift(masks, n) & land
+    return out
+
+def _slide(sliders, empty, steps):
+    """ sliding attacks of `sliders` along `steps`, stopping at (and including) the first blocker """
+    out = np.zeros_like(sliders)
+    for n, land in steps:
+        gen = sliders
+        pro = empty & land
+        # occluded fill in 1, 2 and 4 steps, then one more step onto the blocker
+        gen = gen | (pro & _shift(gen, n))
+        pro = pro & _shift(pro, n)
+        gen = gen | (pro & _shift(gen, 2 * n))
+        pro = pro & _shift(pro, 2 * n)
+        gen = gen | (pro & _shift(gen, 4 * n))
+        out |= _shift(gen, n) & land
+    return out
+
+def _pawn_attacks(pawns, dark):
+    """ squares attacked by `pawns`; `dark` is a bool array choosing the direction per position """
+    light = (_shift(pawns, -7) & NOT_A) | (_shift(pawns, -9) & NOT_H)
+    darks = (_shift(pawns, 9) & NOT_A) | (_shift(pawns, 7) & NOT_H)
+    return np.where(dark, darks, light)
+
+class BoardBatch():
+    """ N positions stored column-wise in NumPy arrays """
+    def __init__(self, size=0):
+        self.masks = np.zeros((9, size), dtype=np.uint64)  # rows indexed like Board.masks
+        self.turn = np.zeros(size, dtype=bool)             # True when dark is to move
+        self.castling = np.zeros(size, dtype=np.uint8)     # Board.castling bits
+        self.ep_bit = np.full(size, -1, dtype=np.int8)     # -1 when there is no en passant square
+
+    @classmethod
+    def from_boards(cls, boards):
+        boards = list(boards)
+        batch = cls(len(boards))
+        for i, board in enumerate(boards):
+            batch[i] = board
+        return batch
+
+    @classmethod
+    def from_fens(cls, fens):
+        """ batch from an iterable of FEN strings (or chess.iter_fens(path, reuse=True)) """
+        masks = [[] for _ in range(9)]
+        turn, castling, ep_bit = [], [], []
+        board = chess.Board.__new__(chess.Board)
+        for fen in fens:
+            if isinstance(fen, chess.Board):
+                board = fen
+            else:
+                board.set_fen(fen)
+            for row, mask in zip(masks, board.masks):
+                row.append(mask)
+            turn.append(bool(board.turn))
+            castling.append(board.castling)
+            ep_bit.append(-1 if board.ep_bit is None else board.ep_bit)
+        batch = cls(0)
+        batch.masks = np.array(masks, dtype=np.uint64).reshape(9, len(turn))
+        batch.turn = np.array(turn, dtype=bool)
+        batch.castling = np.array(castling, dtype=np.uint8)
+        batch.ep_bit = np.array(ep_bit, dtype=np.int8)
+        return batch
+
+    def __len__(self):
+        return len(self.turn)
+
+    def __getitem__(self, i):
+        """ position `i` as a chess.Board (move clocks are not stored, so they start over) """
+        board = chess.Board(turn=chess.COLORS[bool(self.turn[i])],
+                ep_bit=None if self.ep_bit[i] < 0 else int(self.ep_bit[i]))
+        board.castling = int(self.castling[i])
+        board.masks = [int(mask) for mask in self.masks[:, i]]
+        board._sync()
+        return board
+
+    def __setitem__(self, i, board):
+        self.masks[:, i] = board.masks
+        self.turn[i] = bool(board.turn)
+        self.castling[i] = board.castling
+        self.ep_bit[i] = -1 if board.ep_bit is None else board.ep_bit
+
+    @property
+    def bbs(self):
+        """ uint64 array per Board.bbs key (views into self.masks) """
+        return dict((key, self.masks[index]) for key, index in BBS_INDICES.items())
+
+    def _colors(self, color):
+        """ bool array of the dark side per position for `color` (None: side to move) """
+        if color is None:
+            return self.turn
+        if isinstance(color, chess.Color):
+            color = bool(color)
+        return np.broadcast_to(np.asarray(color, dtype=bool), self.turn.shape)
+
+    def attacks(self, color=None):
+        """ squares attacked by `color` (Color, 0/1 or a bool array; default: side to move) """
+        dark = self._colors(color)
+        masks = self.masks
+        own = np.where(dark, masks[DARK], masks[LIGHT])
+        empty = ~masks[ALL]
+        queens = masks[QUEEN]
+        return (_pawn_attacks(own & masks[PAWN], dark)
+                | _steps(own & masks[KNIGHT], KNIGHT_STEPS)
+                | _steps(own & masks[KING], KING_STEPS)
+                | _slide(own & (masks[BISHOP] | queens), empty, BISHOP_STEPS)
+                | _slide(own & (masks[ROOK] | queens), empty, ROOK_STEPS))
+
+    def in_check(self):
+        """ bool array: is the side to move in check """
+        masks = self.masks
+        kings = np.where(self.turn, masks[DARK], masks[LIGHT]) & masks[KING]
+        return (kings & self.attacks(~self.turn)) != 0
+
+    def targets(self):
+        """ (6, N) array of pseudo-legal target squares for the side to move, rows KING..PAWN """
+        masks = self.masks
+        dark = self.turn
+        own = np.where(dark, masks[DARK], masks[LIGHT])
+        occ = masks[ALL]
+        them = occ ^ own
+        empty = ~occ
+        notown = ~own
+        queens = masks[QUEEN]
+        out = np.zeros((6, len(self)), dtype=np.uint64)
+        # pawns: pushes, double pushes from the home rank and captures (en passant included)
+        pawns = own & masks[PAWN]
+        single = np.where(dark, _shift(pawns, 8), _shift(pawns, -8)) & empty
+        double = np.where(dark, _shift(single & U64(RANK_MASKS[5]), 8),
+                _shift(single & U64(RANK_MASKS[2]), -8)) & empty
+        has_ep = self.ep_bit >= 0
+        ep = np.where(has_ep, U64(1) << np.where(has_ep, self.ep_bit, 0).astype(np.uint64), U64(0))
+        out[PAWN - KING] = single | double | (_pawn_attacks(pawns, dark) & (them | ep))
+        out[KNIGHT - KING] = _steps(own & masks[KNIGHT], KNIGHT_STEPS) & notown
+        out[BISHOP - KING] = _slide(own & masks[BISHOP], empty, BISHOP_STEPS) & notown
+        out[ROOK - KING] = _slide(own & masks[ROOK], empty, ROOK_STEPS) & notown
+        own_queens = own & queens
+        out[QUEEN - KING] = (_slide(own_queens, empty, BISHOP_STEPS)
+                | _slide(own_queens, empty, ROOK_STEPS)) & notown
+        # king steps plus castling (rights, rook at home and an empty path; attacks are not checked)
+        kings = own & masks[KING]
+        rights = np.where(dark, self.castling >> 2, self.castling) & 0b11
+        home = np.where(dark, U64(4), U64(60))
+        at_home = (kings >> home) & U64(1) != 0
+        rooks = own & masks[ROOK]
+        king_side = (at_home & (rights & 0b01 != 0) & ((rooks >> (home + U64(3))) & U64(1) != 0)
+                & (occ & (U64(0b11) << (home + U64(1))) == 0))
+        queen_side = (at_home & (rights & 0b10 != 0) & ((rooks >> (home - U64(4))) & U64(1) != 0)
+                & (occ & (U64(0b111) << (home - U64(3))) == 0))
+        castles = (np.where(king_side, U64(1) << (home + U64(2)), U64(0))
+                | np.where(queen_side, U64(1) << (home - U64(2)), U64(0)))
+        out[KING - KING] = (_steps(kings, KING_STEPS) & notown) | castles
+        return out
+
+    def target_mask(self):
+        """ union of targets() over all piece types """
+        return np.bitwise_or.reduce(self.targets(), axis=0)
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+""" Polyglot opening book reader
+
+A Polyglot .bin book is a file of 16-byte big-endian entries (key, move, weight, learn)
+sorted by key, where the key is the Polyglot hash of the position. The file is
+memory-mapped and probed with a binary search, so opening even a very large book
+costs nothing up front and a probe touches only a few pages.
+
+Polyglot hashes are computed with the 781 standard "Random64" numbers from the format
+specification, bundled in chess_box.polyglot. Another table can be passed as a sequence, or
+as a path to a text file holding the 781 numbers in order (in hex, e.g. "0x9D39247E33776D41",
+one or more per line), or named by $CHESSY_POLYGLOT_RANDOMS.
+"""
+
+from collections import namedtuple
+import mmap
+import os
+import random
+import re
+import struct
+
+from chess_box import chess
+from chess_box.chess import KING, PAWN, CODE_INDICES, PROMOTION_TYPES
+from chess_box.polyglot import RANDOM64
+
+ENTRY = struct.Struct(">QHHI")
+KEY = struct.Struct(">Q")
+RANDOM_COUNT = 781
+RANDOM_CASTLE = 768
+RANDOM_EP = 772
+RANDOM_TURN = 780
+# Polyglot piece kind per mailbox code: black pawn 0, white pawn 1, ..., black king 10, white king 11
+KINDS = (None,) + tuple(2 * (PAWN - index) + (color == chess.LIGHT) for color, index in CODE_INDICES[1:])
+# promotion field: 1 knight, 2 bishop, 3 rook, 4 queen
+PROMOTIONS = (None,) + tuple(reversed(PROMOTION_TYPES))
+HEX_RE = re.compile(r"0[xX]([0-9a-fA-F]{1,16})")
+
+BookEntry = namedtuple("BookEntry", ("move", "weight", "learn"))
+
+def load_randoms(source=None):
+    """ the 781 Random64 numbers from a sequence, a file path, $CHESSY_POLYGLOT_RANDOMS or the standard table """
+    if source is None:
+        source = os.environ.get("CHESSY_POLYGLOT_RANDOMS") or RANDOM64
+    if isinstance(source, (str, bytes, os.PathLike)):
+        with open(source) as f:
+            randoms = tuple(int(digits, 16) for digits in HEX_RE.findall(f.read()))
+    else:
+        randoms = tuple(source)
+    if len(randoms) != RANDOM_COUNT:
+        raise ValueError("expected {} Polyglot random numbers, got {}".format(RANDOM_COUNT, len(randoms)))
+    return randoms
+
+def polyglot_key(board, randoms=RANDOM64):
+    """ Polyglot hash of `board` """
+    key = 0
+    for bit, code in enumerate(board.mailbox):
+        if code:
+            # Polyglot squares count from a1 (0) to h8 (63)
+            key ^= randoms[64 * KINDS[code] + 8 * (7 - bit // 8) + bit % 8]
+    # Board.castling bits are in Polyglot order: white short, white long, black short, black long
+    for i in range(4):
+        if board.castling >> i & 1:
+            key ^= randoms[RANDOM_CASTLE + i]
+    ep_bit = board.ep_bit
+    if ep_bit is not None:
+        # only counted when a pawn of the side to move could actually capture en passant
+        color = int(board.turn)
+        pawns = board.masks[color] & board.masks[PAWN]
+        if chess.PAWN_ATTACKS[color ^ 1][ep_bit] & pawns:
+            key ^= randoms[RANDOM_EP + ep_bit % 8]
+    if not board.turn:
+        key ^= randoms[RANDOM_TURN]
+    return key
+
+def decode_move(board, raw):
+    """ Move for the 16-bit Polyglot move `raw` in `board` (castling is stored as king takes rook) """
+    to_bit = (7 - (raw >> 3 & 7)) * 8 + (raw & 7)
+    from_bit = (7 - (raw >> 9 & 7)) * 8 + (raw >> 6 & 7)
+    promotion = PROMOTIONS[raw >> 12 & 7]
+    code = board.mailbox[from_bit]
+    if code and CODE_INDICES[code][1] == KING and board.mailbox[to_bit] == code + 2 and from_bit % 8 == 4:
+        # king onto its own rook (same color: code + 2 is that side's rook)
+        to_bit = from_bit + (2 if to_bit > from_bit else -2)
+    return chess.Move(from_bit, to_bit, promotion)
+
+class Book():
+    """ memory-mapped Polyglot book; use as a context manager or close() it """
+    def __init__(self, path, randoms=None):
+        self.path = path
+        self.randoms = load_randoms(randoms)
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size % ENTRY.size:
+                raise ValueError("{}: size is not a multiple of {} bytes".format(path, ENTRY.size))
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self._count = size // ENTRY.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+
+    def __len__(self):
+        return self._count
+
+    def _first(self, key):
+        """ index of the first entry with a key >= `key` """
+        lo, hi = 0, self._count
+        mm = self._mm
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if KEY.unpack_from(mm, mid * ENTRY.size)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def entries(self, board):
+        """ BookEntries for `board`, keeping only moves that are legal there """
+        key = polyglot_key(board, self.randoms)
+        legal = None
+        entries = []
+        for i in range(self._first(key), self._count):
+            entry_key, raw, weight, learn = ENTRY.unpack_from(self._mm, i * ENTRY.size)
+            if entry_key != key:
+                break
+            if legal is None:
+                legal = set(board.legal_moves())
+            move = decode_move(board, raw)
+            if move in legal:
+                entries.append(BookEntry(move, weight, learn))
+        return entries
+
+    def moves(self, board):
+        """ [(Move, weight)] for `board`, best weighted first """
+        entries = sorted(self.entries(board), key=lambda entry: entry.weight, reverse=True)
+        return [(entry.move, entry.weight) for entry in entries]
+
+    def choice(self, board, rng=random):
+        """ a book move picked with probability proportional to its weight, or None """
+        entries = [entry for entry in self.entries(board) if entry.weight]
+        if not entries:
+            return None
+        return rng.choices([entry.move for entry in entries], [entry.weight for entry in entries])[0]
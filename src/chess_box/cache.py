@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+""" where chessy keeps files it can rebuild (slider tables, the UI sprite atlas) """
+
+import os
+import pathlib
+
+def cache_dir():
+    """ $CHESSY_CACHE_DIR, else $XDG_CACHE_HOME/chessy or ~/.cache/chessy """
+    directory = os.environ.get("CHESSY_CACHE_DIR")
+    if not directory:
+        base = os.environ.get("XDG_CACHE_HOME") or pathlib.Path.home() / ".cache"
+        directory = pathlib.Path(base) / "chessy"
+    return pathlib.Path(directory)
@@ -1,7 +1,15 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+from collections import namedtuple
 from enum import Enum, IntFlag
+import random
+import re
+import types
+
+from chess_box.attacks import (FULL_MASK, KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, BETWEEN, LINE,
+        rook_attacks, bishop_attacks)
+from chess_box.pst import MG_VALUES, EG_VALUES, MG_TABLES, EG_TABLES, PHASE_WEIGHTS, PHASE_MAX
 
 class Bitboard():
     """
@@ -24,6 +32,8 @@ class Bitboard():
           +-----------------------+
            A  B  C  D  E  F  G  H
     """
+    __slots__ = ("mask",)
+
     def __init__(self, mask):
         self.mask = mask
 
@@ -128,7 +138,7 @@ class Color(Enum):
     DARK  = True
 
     def __invert__(self):
-        return Color(abs(self._value_-1)) # avoid branches; uses __new__() (perf untested)
+        return COLORS[not self._value_] # tuple lookup; Color(...) goes through Enum.__new__()
 
     def __bool__(self):
         return self._value_
@@ -157,15 +167,33 @@ class PieceType(Enum):
         return name[0] + name[1:].lower()
 
     def __int__(self):
-        return self._member_names_.index(self._name_) + 2
+        return TYPE_INDICES[self._name_]
 
     def __hash__(self):
-        return int(self)
+        return TYPE_INDICES[self._name_]
+
+COLORS = (Color.LIGHT, Color.DARK)
+# PieceType name -> int(PieceType); avoids searching _member_names_
+TYPE_INDICES = dict((name, i + 2) for i, name in enumerate(PieceType._member_names_))
 
 class Piece():
-    def __init__(self, color, piecetype):
-        self.color = color
-        self.piecetype = piecetype
+    """ one interned instance per color and piece type: Piece(c, pt) is Piece(c, pt) """
+    __slots__ = ("color", "piecetype", "code")
+    _interned = {}
+
+    def __new__(cls, color, piecetype):
+        piece = cls._interned.get((color, piecetype))
+        if piece is None:
+            piece = object.__new__(cls)
+            piece.color = color
+            piece.piecetype = piecetype
+            # Board.mailbox code: 1-6 light king..pawn, 7-12 dark king..pawn
+            piece.code = int(color) * 6 + int(piecetype) - 1
+            cls._interned[(color, piecetype)] = piece
+        return piece
+
+    def __reduce__(self):
+        return (Piece, (self.color, self.piecetype))
 
     def get_char(self):
         return self.piecetype.value if self.color else self.piecetype.value.upper()
@@ -176,17 +204,14 @@ class Piece():
     def __format__(self, fmt):
         return str.__format__(self.__str__(), fmt)
 
-    def __format__(self, fmt):
-        return str.__format__(self.__str__(), fmt)
-
     def __repr__(self):
         return "Piece({}, {})".format(self.color, self.piecetype)
 
     def __hash__(self):
-        return (int(self.color) + 2) * (int(self.piecetype) - 2) + 8
+        return self.code
 
     def __eq__(self, o):
-        return o.__class__ == self.__class__ and self.color == o.color and self.piecetype == o.piecetype
+        return self is o
 
     @classmethod
     def from_str(cls, char):
@@ -199,27 +224,250 @@ class MoveStatus(IntFlag):
     CAPTURE   = 4
     CASTLE    = 8
 
+RANK_MASKS = tuple(0b11111111 << (row * 8) for row in range(7, -1, -1)) # rank 1 -> rank 8
+PROMOTION_TYPES = (PieceType.QUEEN, PieceType.ROOK, PieceType.BISHOP, PieceType.KNIGHT)
+
+# indices into Board.masks (the same as int(Color) and int(PieceType)) plus all occupied squares
+LIGHT, DARK = 0, 1
+KING, QUEEN, ROOK, BISHOP, KNIGHT, PAWN = range(2, 8)
+ALL = 8
+START_MASKS = (
+        Bitboard.from_ranks(0b11000000).mask,
+        Bitboard.from_ranks(0b00000011).mask,
+        Bitboard.from_indices(4, 60).mask,
+        Bitboard.from_indices(3, 59).mask,
+        Bitboard.from_quadrant(0).mask,
+        Bitboard.from_quadrant(2).mask,
+        Bitboard.from_quadrant(1).mask,
+        Bitboard.from_ranks(0b01000010).mask,
+        Bitboard.from_ranks(0b11000011).mask,
+        )
+# Board() keyword -> index in Board.masks
+BB_KWARGS = {
+        "bb_all"     : ALL,
+        "bb_lights"  : LIGHT,
+        "bb_darks"   : DARK,
+        "bb_kings"   : KING,
+        "bb_queens"  : QUEEN,
+        "bb_rooks"   : ROOK,
+        "bb_knights" : KNIGHT,
+        "bb_bishops" : BISHOP,
+        "bb_pawns"   : PAWN,
+        }
+# Board.bbs key -> index in Board.masks
+BBS_INDICES = {
+        "all"            : ALL,
+        Color.LIGHT      : LIGHT,
+        Color.DARK       : DARK,
+        PieceType.KING   : KING,
+        PieceType.QUEEN  : QUEEN,
+        PieceType.ROOK   : ROOK,
+        PieceType.KNIGHT : KNIGHT,
+        PieceType.BISHOP : BISHOP,
+        PieceType.PAWN   : PAWN,
+        }
+# Board.castling bits: light king-side, light queen-side, dark king-side, dark queen-side
+# castle privileges kept when a piece moves from or to each square
+CASTLE_KEEP = tuple({0: 0b0111, 4: 0b0011, 7: 0b1011, 56: 0b1101, 60: 0b1100, 63: 0b1110}.get(bit, 0b1111)
+        for bit in range(64))
+# (king square, rook square, king code) per castling bit; the rook's code is the king's + 2
+CASTLE_HOMES = ((60, 63, 1), (60, 56, 1), (4, 7, 7), (4, 0, 7))
+
+def _get_zobrist():
+    # fixed seed so keys are stable across runs (they may be persisted)
+    rng = random.Random(0x436865737379)
+    pieces = tuple(tuple(rng.getrandbits(64) for bit in range(64)) for index in range(12))
+    turn = rng.getrandbits(64)
+    castle = tuple(rng.getrandbits(64) for rights in range(16))
+    ep = tuple(rng.getrandbits(64) for file in range(8))
+    return pieces, turn, castle, ep
+# pieces are indexed by mailbox code - 1 (0-11: light king..pawn, dark king..pawn);
+# castle by Board.castling; ep by file
+ZOBRIST_PIECES, ZOBRIST_TURN, ZOBRIST_CASTLE, ZOBRIST_EP = _get_zobrist()
+
+# Board.mailbox holds Piece.code per square (0 is empty)
+EMPTY = 0
+CODE_CHARS = "_KQRBNPkqrbnp"
+# mailbox code -> interned Piece and (color index, piece type index) into Board.masks
+PIECES = (None,) + tuple(Piece(c, pt) for c in Color for pt in PieceType)
+CODE_INDICES = (None,) + tuple((c, t) for c in (LIGHT, DARK) for t in range(2, 8))
+
+def _get_scores(values, tables):
+    """ material plus piece-square score per mailbox code and bit, positive for light """
+    scores = [(0,) * 64]
+    for color, index in CODE_INDICES[1:]:
+        value, table = values[index - KING], tables[index - KING]
+        if color:
+            scores.append(tuple(-value - table[bit ^ 56] for bit in range(64)))
+        else:
+            scores.append(tuple(value + table[bit] for bit in range(64)))
+    return tuple(scores)
+# Board.mg/eg terms per mailbox code and bit, and Board.phase weight per mailbox code
+MG_SCORES = _get_scores(MG_VALUES, MG_TABLES)
+EG_SCORES = _get_scores(EG_VALUES, EG_TABLES)
+PHASES = (0,) + tuple(PHASE_WEIGHTS[index - KING] for color, index in CODE_INDICES[1:])
+
+# plies without a capture or pawn move after which a draw can be claimed
+FIFTY_MOVE_PLIES = 100
+
+# piece letter, from file, from rank, target square, promotion
+SAN_RE = re.compile(r"^([KQRBN])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([QRBNqrbn]))?$")
+
+def square_name(bit):
+    return "abcdefgh"[bit % 8] + str(8 - bit // 8)
+
+def parse_square(name):
+    if len(name) != 2 or name[0].lower() not in "abcdefgh" or name[1] not in "12345678":
+        raise ValueError("invalid square {!r}".format(name))
+    return (8 - int(name[1])) * 8 + "abcdefgh".index(name[0].lower())
+
+def iter_bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+class Move(namedtuple("Move", ("from_bit", "to_bit", "promotion"))):
+    """ from square, target square and optional promotion PieceType """
+    __slots__ = ()
+
+    def __new__(cls, from_bit, to_bit, promotion=None):
+        return super().__new__(cls, from_bit, to_bit, promotion)
+
+    def uci(self):
+        promo = self.promotion.value if self.promotion else ""
+        return square_name(self.from_bit) + square_name(self.to_bit) + promo
+
+    def __str__(self):
+        return self.uci()
+
+    @classmethod
+    def from_uci(cls, text):
+        promo = PieceType(text[4].lower()) if len(text) > 4 else None
+        return cls(parse_square(text[:2]), parse_square(text[2:4]), promo)
+
+class BitboardView(Bitboard):
+    """ Bitboard reading and writing one of a Board's occupancy masks in place """
+    __slots__ = ("board", "index")
+
+    def __init__(self, board, index):
+        self.board = board
+        self.index = index
+
+    @property
+    def mask(self):
+        return self.board.masks[self.index]
+
+    @mask.setter
+    def mask(self, mask):
+        self.board.masks[self.index] = mask
+        self.board._sync()
+
+    def copy(self):
+        return Bitboard(self.mask)
+
+    def __or__(self, bb):
+        return Bitboard(self.mask | bb.mask)
+
+    def __and__(self, bb):
+        return Bitboard(self.mask & bb.mask)
+
+    def __xor__(self, bb):
+        return Bitboard(self.mask ^ bb.mask)
+
+    def __invert__(self):
+        return Bitboard((~self.mask) & FULL_MASK)
+
 class Board():
+    __slots__ = ("turn", "halfmove_clock", "fullmove", "ep_bit", "castling", "states",
+            "movestatus", "error_msg", "error", "masks", "mailbox", "zobrist", "mg", "eg", "phase")
+
     def __init__(self, **kwargs):
         self.turn = kwargs.get("turn", Color.LIGHT)
         self.halfmove_clock = kwargs.get("halfmove_clock", 0)
+        self.fullmove = kwargs.get("fullmove", 1)
         self.ep_bit = kwargs.get("ep_bit", None)
-        self.castle = kwargs.get("castle", dict((c, 0b11) for c in Color))
+        self.castling = 0b1111
+        if "castle" in kwargs:
+            self.castle = kwargs["castle"]
         self.states = []
         self.movestatus = MoveStatus(0)
         self.error_msg = None
         self.error  = False
-        self.bbs = {
-                "all"            : kwargs.get("bb_all"     , Bitboard.from_ranks(0b11000011)),
-                Color.LIGHT      : kwargs.get("bb_lights"  , Bitboard.from_ranks(0b11000000)),
-                Color.DARK       : kwargs.get("bb_darks"   , Bitboard.from_ranks(0b00000011)),
-                PieceType.KING   : kwargs.get("bb_kings"   , Bitboard.from_indices(4, 60)),
-                PieceType.QUEEN  : kwargs.get("bb_queens"  , Bitboard.from_indices(3, 59)),
-                PieceType.ROOK   : kwargs.get("bb_rooks"   , Bitboard.from_quadrant(0)),
-                PieceType.KNIGHT : kwargs.get("bb_knights" , Bitboard.from_quadrant(1)),
-                PieceType.BISHOP : kwargs.get("bb_bishops" , Bitboard.from_quadrant(2)),
-                PieceType.PAWN   : kwargs.get("bb_pawns"   , Bitboard.from_ranks(0b01000010)),
-                }
+        # occupancy masks indexed by LIGHT, DARK, KING..PAWN and ALL; Bitboard kwargs are still accepted
+        self.masks = list(START_MASKS)
+        for kw, index in BB_KWARGS.items():
+            if kw in kwargs:
+                self.masks[index] = getattr(kwargs[kw], "mask", kwargs[kw])
+        self._sync()
+
+    def _sync(self):
+        """ rebuild the all-occupancy, mailbox and zobrist key from the color and piece type masks """
+        masks = self.masks
+        masks[ALL] = masks[LIGHT] | masks[DARK]
+        # piece code per square, kept in sync with the masks
+        self.mailbox = bytearray(64)
+        for code, (color, index) in enumerate(CODE_INDICES[1:], 1):
+            for bit in iter_bits(masks[color] & masks[index]):
+                self.mailbox[bit] = code
+        self.zobrist = self.zobrist_hash()
+        self.mg, self.eg, self.phase = self._eval_terms()
+
+    @property
+    def bbs(self):
+        """ Bitboard views of the occupancy masks keyed by "all", Color and PieceType """
+        return dict((key, BitboardView(self, index)) for key, index in BBS_INDICES.items())
+
+    @property
+    def castle(self):
+        """ castle privileges per Color (0b10 queen-side, 0b01 king-side)
+
+        The mapping is a read-only snapshot of Board.castling: assign a whole dict to change it.
+        """
+        return types.MappingProxyType({Color.LIGHT: self.castling & 0b11, Color.DARK: self.castling >> 2})
+
+    @castle.setter
+    def castle(self, castle):
+        self.castling = castle[Color.LIGHT] | castle[Color.DARK] << 2
+
+    def _state_key(self):
+        """ zobrist key of turn, castle privileges and en passant square
+
+        The en passant file only counts when a pawn of the side to move could capture there, so
+        a double push nobody can take doesn't make the position differ from its repetitions.
+        """
+        key = ZOBRIST_CASTLE[self.castling]
+        color = int(self.turn)
+        if color:
+            key ^= ZOBRIST_TURN
+        ep_bit = self.ep_bit
+        if ep_bit is not None and PAWN_ATTACKS[color ^ 1][ep_bit] & self.masks[color] & self.masks[PAWN]:
+            key ^= ZOBRIST_EP[ep_bit % 8]
+        return key
+
+    def zobrist_hash(self):
+        """ compute the zobrist key from scratch (Board.zobrist is kept up to date incrementally) """
+        key = self._state_key()
+        for bit, code in enumerate(self.mailbox):
+            if code:
+                key ^= ZOBRIST_PIECES[code - 1][bit]
+        return key
+
+    def _eval_terms(self):
+        """ (mg, eg, phase) from scratch; Board keeps them up to date incrementally in _put() """
+        mg = eg = phase = 0
+        for bit, code in enumerate(self.mailbox):
+            if code:
+                mg += MG_SCORES[code][bit]
+                eg += EG_SCORES[code][bit]
+                phase += PHASES[code]
+        return mg, eg, phase
+
+    def evaluate(self):
+        """ material and piece-square score in centipawns for the side to move, tapered by game phase """
+        phase = min(self.phase, PHASE_MAX)
+        score = (self.mg * phase + self.eg * (PHASE_MAX - phase)) // PHASE_MAX
+        return -score if self.turn else score
 
     def valid_move(self, from_bit, to_bit):
         self.movestatus = MoveStatus.INVALID
@@ -236,17 +484,21 @@ class Board():
         if to_bit == from_bit:
             self.error = True
             self.error_msg = "from and target square are the same"
-        fp = self[from_bit]
+            return False
+        mailbox = self.mailbox
+        fp = PIECES[mailbox[from_bit]]
         if fp is None:
             self.error = True
             self.error_msg = "selected piece empty"
             return False
-        if fp.color != self.turn:
+        # integer color and piece type (see CODE_INDICES) keep Enum lookups off this path
+        color, ptype = CODE_INDICES[fp.code]
+        if color != int(self.turn):
             self.error = True
             self.error_msg = "not {}'s turn".format(~self.turn)
             return False
-        tp = self[to_bit]
-        if tp and fp.color == tp.color:
+        tp = PIECES[mailbox[to_bit]]
+        if tp and color == CODE_INDICES[tp.code][0]:
             self.error = True
             self.error_msg = "cannot capture own color"
             return False
@@ -256,8 +508,8 @@ class Board():
         # ---------
         # pawn move
         # ---------
-        if fp.piecetype == PieceType.PAWN:
-            front, start = (8,8) if fp.color else (-8,48)
+        if ptype == PAWN:
+            front, start = (8,8) if color else (-8,48)
             # moved once forward
             if dif == front:
                 if tp is not None:
@@ -270,7 +522,7 @@ class Board():
                 if from_bit < start or from_bit > start + 7:
                     self.error = True
                     self.error_msg = "{} can only move two squares on the first move".format(fp)
-                elif self[from_bit + front] is not None:
+                elif mailbox[from_bit + front]:
                     self.error = True
                     self.error_msg = "{} cannot move through another piece".format(fp)
                 elif tp is not None:
@@ -294,7 +546,7 @@ class Board():
         # -----------
         # knight move
         # -----------
-        elif fp.piecetype == PieceType.KNIGHT:
+        elif ptype == KNIGHT:
             if abs(dif) in {6, 10, 15, 17} and abs(xdif) < 3:
                 self.movestatus = MoveStatus.VALID
             else:
@@ -303,89 +555,78 @@ class Board():
         # -----------
         # bishop move
         # -----------
-        elif fp.piecetype == PieceType.BISHOP:
+        elif ptype == BISHOP:
             if abs(xdif) != abs(ydif):
                 self.error = True
                 self.error_msg = "invalid target square for {}".format(fp)
+            elif BETWEEN[from_bit][to_bit] & self.masks[ALL]:
+                self.error = True
+                self.error_msg = "{} cannot move through another piece".format(fp)
             else:
-                inc = ydif // abs(ydif) * (9 if xdif == ydif else 7)
-                for x in range(from_bit + inc, to_bit, inc):
-                    if self[x]:
-                        self.error = True
-                        self.error_msg = "{} cannot move through another piece".format(fp)
-                        break
-                else:
-                    self.movestatus = MoveStatus.VALID
+                self.movestatus = MoveStatus.VALID
         # ---------
         # rook move
         # ---------
-        elif fp.piecetype == PieceType.ROOK:
+        elif ptype == ROOK:
             if xdif * ydif != 0:
                 self.error = True
                 self.error_msg = "invalid target square for {}".format(fp)
+            elif BETWEEN[from_bit][to_bit] & self.masks[ALL]:
+                self.error = True
+                self.error_msg = "{} cannot move through another piece".format(fp)
             else:
-                inc = (xdif + ydif) // abs(xdif + ydif) * (1 if xdif else 8)
-                for x in range(from_bit + inc, to_bit, inc):
-                    if self[x]:
-                        self.error = True
-                        self.error_msg = "{} cannot move through another piece".format(fp)
-                        break
-                else:
-                    self.movestatus = MoveStatus.VALID
+                self.movestatus = MoveStatus.VALID
         # ----------
         # queen move
         # ----------
-        elif fp.piecetype == PieceType.QUEEN:
-            # diagonals (like bishop)
-            if abs(xdif) == abs(ydif):
-                inc = ydif // abs(ydif) * (9 if xdif == ydif else 7)
-                for x in range(from_bit + inc, to_bit, inc):
-                    if self[x]:
-                        self.error = True
-                        self.error_msg = "{} cannot move through another piece".format(fp)
-                        break
-                else:
-                    self.movestatus = MoveStatus.VALID
-            # ranks/files (like rook)
-            elif xdif * ydif == 0:
-                inc = (xdif + ydif) // abs(xdif + ydif) * (1 if xdif else 8)
-                for x in range(from_bit + inc, to_bit, inc):
-                    if self[x]:
-                        self.error = True
-                        self.error_msg = "{} cannot move through another piece".format(fp)
-                        break
-                else:
-                    self.movestatus = MoveStatus.VALID
-            # invalid
-            else:
+        elif ptype == QUEEN:
+            # diagonals (like bishop) or ranks/files (like rook)
+            if abs(xdif) != abs(ydif) and xdif * ydif != 0:
                 self.error = True
                 self.error_msg = "invalid target square for {}".format(fp)
-        elif fp.piecetype == PieceType.KING:
+            elif BETWEEN[from_bit][to_bit] & self.masks[ALL]:
+                self.error = True
+                self.error_msg = "{} cannot move through another piece".format(fp)
+            else:
+                self.movestatus = MoveStatus.VALID
+        elif ptype == KING:
             # NOTE: castling doesn't handle all chess960 variants
             # queen-side castle
-            if xdif == -2:
-                if not self.castle[self.turn] & 0b10:
+            if xdif == -2 and ydif == 0:
+                if not self.castling & (0b1000 if color else 0b0010):
                     self.error = True
                     self.error_msg = "{} does not have privileges to castle queen-side".format(fp)
-                elif self[from_bit-1]:
+                elif from_bit != (4 if color else 60) or not self._own_rook(color, from_bit-4):
+                    self.error = True
+                    self.error_msg = "{} has no rook to castle queen-side with".format(fp)
+                elif mailbox[from_bit-1] or mailbox[from_bit-3]:
                     self.error = True
                     self.error_msg = "{} cannot castle through another piece".format(fp)
-                elif self[from_bit-2]:
+                elif mailbox[from_bit-2]:
                     self.error = True
                     self.error_msg = "{} cannot castle and capture".format(fp)
+                elif self._castle_attacked(from_bit, from_bit-1):
+                    self.error = True
+                    self.error_msg = "{} cannot castle out of or through check".format(fp)
                 else:
                     self.movestatus = MoveStatus.VALID | MoveStatus.CASTLE
             # king-side castle
-            elif xdif == 2:
-                if not self.castle[self.turn] & 0b01:
+            elif xdif == 2 and ydif == 0:
+                if not self.castling & (0b0100 if color else 0b0001):
                     self.error = True
                     self.error_msg = "{} does not have privileges to castle king-side".format(fp)
-                elif self[from_bit+1]:
+                elif from_bit != (4 if color else 60) or not self._own_rook(color, from_bit+3):
+                    self.error = True
+                    self.error_msg = "{} has no rook to castle king-side with".format(fp)
+                elif mailbox[from_bit+1]:
                     self.error = True
                     self.error_msg = "{} cannot castle through another piece".format(fp)
-                elif self[from_bit+2]:
+                elif mailbox[from_bit+2]:
                     self.error = True
                     self.error_msg = "{} cannot castle and capture".format(fp)
+                elif self._castle_attacked(from_bit, from_bit+1):
+                    self.error = True
+                    self.error_msg = "{} cannot castle out of or through check".format(fp)
                 else:
                     self.movestatus = MoveStatus.VALID | MoveStatus.CASTLE
             # can move one square only
@@ -411,130 +652,547 @@ class Board():
             self.movestatus |= MoveStatus.CAPTURE
         return True
 
-    def in_check(self, from_bit, to_bit):
-        cking = Piece(self.turn, PieceType.KING)
-        for bit, p in enumerate(self):
-            if p == cking:
-                cking = bit
-                break
-        cx, cy = bit % 8, bit // 8
-        knights = ( (-1, -2), (1, -2), (-2, -1), (2, -1), (-1, 2), (1, 2), (-2, 1), (2, 1) )
-        kings = ( (-1, -1), (-1, 0), (-1, 1), (-1, 0), (1, 0), (-1, 1), (0, 1), (1, 1) )
-        K,Q,R,B,N,P = tuple(Piece(~self.turn, pt) for pt in PieceType)
-        for rx,ry in knights:
-            x = cx + rx
-            y = cy + ry
-            if x < 0 or x > 8 or y < 0 or y < 8:
-                continue
-            b = y * 8 + x
-            if self[b] == N:
-                return True
-        rels = (
-                (-1, -1, {B,Q}, (lambda x,y: x >= 0 and y >= 0)),
-                ( 1, -1, {B,Q}, (lambda x,y: x <= 8 and y >= 0)),
-                (-1,  1, {B,Q}, (lambda x,y: x >= 0 and y <= 8)),
-                ( 1,  1, {B,Q}, (lambda x,y: x <= 8 and y <= 8)),
-                ( 1,  0, {R,Q}, (lambda x,y: x <= 8)),
-                ( 0,  1, {R,Q}, (lambda x,y: y <= 8)),
-                (-1,  0, {R,Q}, (lambda x,y: x >= 0)),
-                ( 0, -1, {R,Q}, (lambda x,y: y >= 0)),
-                )
-        for rel in rels:
-            rx, ry, s, test = rel
-            x = cx + rx
-            y = cy + ry
-            while test(x, y):
-                b = y * 8 + x
-                p = self[b]
-                if p in s:
-                    return True
-                x += rx
-                y += ry
-        for rx,ry in kings:
-            x = cx + rx
-            y = cy + ry
-            if x < 0 or x > 8 or y < 0 or y < 8:
-                continue
-            b = y * 8 + x
-            if self[b] == K:
-                return True
+    def _attacked(self, bit, attackers, occ):
+        """ is `bit` attacked by any piece in the `attackers` mask given occupancy `occ` """
+        masks = self.masks
+        if KNIGHT_ATTACKS[bit] & attackers & masks[KNIGHT]:
+            return True
+        if KING_ATTACKS[bit] & attackers & masks[KING]:
+            return True
+        # a pawn attacks `bit` from the squares a pawn on `bit` of the other color would attack
+        color = DARK if attackers & masks[DARK] else LIGHT
+        if PAWN_ATTACKS[color ^ 1][bit] & attackers & masks[PAWN]:
+            return True
+        queens = masks[QUEEN]
+        rooks = attackers & (masks[ROOK] | queens)
+        if rooks and rook_attacks(bit, occ) & rooks:
+            return True
+        bishops = attackers & (masks[BISHOP] | queens)
+        if bishops and bishop_attacks(bit, occ) & bishops:
+            return True
         return False
 
+    def attackers(self, bit, by_color, occ=None):
+        """ mask of `by_color`'s pieces attacking `bit` (occupancy `occ` defaults to the board) """
+        masks = self.masks
+        if occ is None:
+            occ = masks[ALL]
+        color = int(by_color)
+        queens = masks[QUEEN]
+        return masks[color] & (
+                KNIGHT_ATTACKS[bit] & masks[KNIGHT]
+                | KING_ATTACKS[bit] & masks[KING]
+                | PAWN_ATTACKS[color ^ 1][bit] & masks[PAWN]
+                | rook_attacks(bit, occ) & (masks[ROOK] | queens)
+                | bishop_attacks(bit, occ) & (masks[BISHOP] | queens))
+
+    def is_square_attacked(self, bit, by_color):
+        return self._attacked(bit, self.masks[int(by_color)], self.masks[ALL])
+
+    def king_bit(self, color):
+        kings = self.masks[int(color)] & self.masks[KING]
+        return kings.bit_length() - 1 if kings else None
+
+    def checkers(self):
+        """ mask of pieces giving check to the side to move """
+        color = int(self.turn)
+        king = self.king_bit(color)
+        if king is None:
+            return 0
+        return self.attackers(king, color ^ 1)
+
+    def pinned(self, color=None):
+        """ mask of `color`'s pieces (default: side to move) pinned to their own king """
+        color = int(self.turn if color is None else color)
+        king = self.king_bit(color)
+        if king is None:
+            return 0
+        masks = self.masks
+        own = masks[color]
+        them = masks[ALL] ^ own
+        queens = masks[QUEEN]
+        # enemy sliders that would hit the king if own pieces were transparent
+        snipers = them & (rook_attacks(king, them) & (masks[ROOK] | queens)
+                | bishop_attacks(king, them) & (masks[BISHOP] | queens))
+        pinned = 0
+        for sniper in iter_bits(snipers):
+            blockers = BETWEEN[king][sniper] & masks[ALL]
+            if blockers & own and not blockers & (blockers - 1):
+                pinned |= blockers
+        return pinned
+
+    def in_check(self, from_bit=None, to_bit=None):
+        return bool(self.checkers())
+
     def future_check(self, from_bit, to_bit):
-        bbs_backup = dict((k,bb.copy()) for k,bb in self.bbs.items())
-        self[to_bit] = self[from_bit]
-        self[from_bit] = None
-        in_check = self.in_check(from_bit, to_bit)
-        self.bbs = bbs_backup
-        return in_check
-
-    def make_move(self, from_bit, to_bit):
+        """ would moving from `from_bit` to `to_bit` leave the side to move in check """
+        king = self.king_bit(self.turn)
+        if king is None:
+            return False
+        return not self._is_legal(from_bit, to_bit, king, self.checkers(), self.pinned())
+
+    def _is_legal(self, from_bit, to_bit, king, checkers, pinned):
+        """ legality of a pseudo-legal move for the side to move given its checkers and pinned masks """
+        masks = self.masks
+        occ = masks[ALL]
+        them = occ ^ masks[int(self.turn)]
+        if from_bit == king:
+            if abs(to_bit - from_bit) == 2:
+                # cannot castle out of or through check
+                if checkers or self._attacked((from_bit + to_bit) // 2, them, occ):
+                    return False
+            return not self._attacked(to_bit, them, occ ^ (1 << from_bit))
+        if checkers & (checkers - 1):
+            # double check: only the king can move
+            return False
+        if pinned & (1 << from_bit) and not LINE[king][from_bit] & (1 << to_bit):
+            return False
+        if to_bit == self.ep_bit and masks[PAWN] & (1 << from_bit):
+            # en passant removes two pieces from a line at once; test the resulting occupancy
+            captured = 1 << (to_bit + (-8 if self.turn else 8))
+            return not self._attacked(king, them & ~captured, (occ ^ (1 << from_bit) ^ captured) | (1 << to_bit))
+        if checkers:
+            # capture the checker or block it
+            return bool((1 << to_bit) & (checkers | BETWEEN[king][checkers.bit_length() - 1]))
+        return True
+
+    def pseudo_legal_moves(self):
+        """ generate moves that obey piece movement but may leave the king in check """
+        masks = self.masks
+        color = int(self.turn)
+        own = masks[color]
+        occ = masks[ALL]
+        them = occ ^ own
+        empty = ~occ & FULL_MASK
+        # -----
+        # pawns
+        # -----
+        pawns = own & masks[PAWN]
+        if color:
+            front = 8
+            single = (pawns << 8) & empty
+            double = ((single & RANK_MASKS[5]) << 8) & empty
+            last = RANK_MASKS[0]
+        else:
+            front = -8
+            single = (pawns >> 8) & empty
+            double = ((single & RANK_MASKS[2]) >> 8) & empty
+            last = RANK_MASKS[7]
+        for to_bit in iter_bits(single):
+            if (1 << to_bit) & last:
+                for pt in PROMOTION_TYPES:
+                    yield Move(to_bit - front, to_bit, pt)
+            else:
+                yield Move(to_bit - front, to_bit)
+        for to_bit in iter_bits(double):
+            yield Move(to_bit - 2 * front, to_bit)
+        targets = them
+        if self.ep_bit is not None:
+            targets |= 1 << self.ep_bit
+        for from_bit in iter_bits(pawns):
+            for to_bit in iter_bits(PAWN_ATTACKS[color][from_bit] & targets):
+                if (1 << to_bit) & last:
+                    for pt in PROMOTION_TYPES:
+                        yield Move(from_bit, to_bit, pt)
+                else:
+                    yield Move(from_bit, to_bit)
+        # ------
+        # pieces
+        # ------
+        notown = ~own & FULL_MASK
+        queens = masks[QUEEN]
+        for from_bit in iter_bits(own & masks[KNIGHT]):
+            for to_bit in iter_bits(KNIGHT_ATTACKS[from_bit] & notown):
+                yield Move(from_bit, to_bit)
+        for from_bit in iter_bits(own & (masks[BISHOP] | queens)):
+            for to_bit in iter_bits(bishop_attacks(from_bit, occ) & notown):
+                yield Move(from_bit, to_bit)
+        for from_bit in iter_bits(own & (masks[ROOK] | queens)):
+            for to_bit in iter_bits(rook_attacks(from_bit, occ) & notown):
+                yield Move(from_bit, to_bit)
+        king = self.king_bit(color)
+        if king is None:
+            return
+        for to_bit in iter_bits(KING_ATTACKS[king] & notown):
+            yield Move(king, to_bit)
+        # --------
+        # castling
+        # --------
+        # NOTE: castling doesn't handle chess960 variants
+        rights = (self.castling >> (2 * color)) & 0b11
+        home = 4 if color else 60
+        if rights and king == home:
+            rooks = own & masks[ROOK]
+            if rights & 0b01 and rooks & (1 << (home + 3)) and not occ & (0b11 << (home + 1)):
+                yield Move(home, home + 2)
+            if rights & 0b10 and rooks & (1 << (home - 4)) and not occ & (0b111 << (home - 3)):
+                yield Move(home, home - 2)
+
+    def _own_rook(self, color, bit):
+        """ is a rook of integer `color` on `bit` """
+        return bool(self.masks[color] & self.masks[ROOK] & (1 << bit))
+
+    def _castle_attacked(self, from_bit, through_bit):
+        """ cannot castle out of or through check """
+        them = ~self.turn
+        return self.is_square_attacked(from_bit, them) or self.is_square_attacked(through_bit, them)
+
+    def legal_moves(self):
+        """ generate moves that do not leave the king in check """
+        king = self.king_bit(self.turn)
+        if king is None:
+            yield from self.pseudo_legal_moves()
+            return
+        checkers = self.checkers()
+        pinned = self.pinned()
+        is_legal = self._is_legal
+        for move in self.pseudo_legal_moves():
+            if is_legal(move[0], move[1], king, checkers, pinned):
+                yield move
+
+    def parse_san(self, san):
+        """ resolve Standard Algebraic Notation (e.g. "Nbd2", "exd8=Q+", "O-O") to a legal Move """
+        text = san.rstrip("+#!?")
+        if text in ("O-O", "0-0", "O-O-O", "0-0-0"):
+            king = self.king_bit(self.turn)
+            if king is not None:
+                to_bit = king + (2 if len(text) == 3 else -2)
+                for move in self.legal_moves():
+                    if move.from_bit == king and move.to_bit == to_bit:
+                        return move
+            raise ValueError("illegal castle {!r}".format(san))
+        match = SAN_RE.match(text)
+        if not match:
+            raise ValueError("invalid SAN {!r}".format(san))
+        letter, from_file, from_rank, target, promo = match.groups()
+        ptype = int(PieceType(letter.lower())) if letter else PAWN
+        to_bit = parse_square(target)
+        promotion = PieceType(promo.lower()) if promo else None
+        candidates = []
+        for move in self.legal_moves():
+            if (move.to_bit != to_bit
+                    or CODE_INDICES[self.mailbox[move.from_bit]][1] != ptype
+                    or (from_file and "abcdefgh"[move.from_bit % 8] != from_file)
+                    or (from_rank and str(8 - move.from_bit // 8) != from_rank)):
+                continue
+            # a promotion without a piece letter is taken as a queen
+            if move.promotion != (promotion or (move.promotion and PieceType.QUEEN)):
+                continue
+            candidates.append(move)
+        if not candidates:
+            raise ValueError("illegal move {!r}".format(san))
+        if len(candidates) > 1:
+            raise ValueError("ambiguous move {!r}".format(san))
+        return candidates[0]
+
+    def make_move(self, from_bit, to_bit, promotion=None):
         if not self.valid_move(from_bit, to_bit):
             return
-        if MoveStatus.ENPASSANT in self.movestatus:
-            inc = 8 * (to_bit // 32 * 2 - 1)
-            if MoveStatus.CAPTURE in self.movestatus:
-                self[self.ep_bit - inc] = None
-                self.ep_bit = None
-            else:
-                self.ep_bit = to_bit + inc
-        else:
-            self.ep_bit = None
-        if MoveStatus.CASTLE in self.movestatus:
-            self.castle[self.turn] = 0b00
+        self.push(Move(from_bit, to_bit, promotion))
+
+    def push(self, move):
+        """ apply `move` without validating it (use moves from legal_moves()); undo with pop() """
+        from_bit, to_bit, promotion = move
+        mailbox = self.mailbox
+        code = mailbox[from_bit]
+        color, ptype = CODE_INDICES[code]
+        capture_bit = to_bit
+        ep_bit = self.ep_bit
+        if ptype == PAWN and to_bit == ep_bit:
+            # captured pawn is behind the target square
+            capture_bit = to_bit + (-8 if color else 8)
+        captured = mailbox[capture_bit]
+        # undo record: move, moved code, captured code, captured square, castling, ep_bit, halfmove_clock, zobrist
+        self.states.append((move, code, captured, capture_bit,
+            self.castling, ep_bit, self.halfmove_clock, self.zobrist))
+        self.zobrist ^= self._state_key()
+        self.ep_bit = None
+        self.halfmove_clock += 1
+        if ptype == PAWN:
+            self.halfmove_clock = 0
+            if abs(to_bit - from_bit) == 16:
+                self.ep_bit = (from_bit + to_bit) // 2
+            elif (1 << to_bit) & (RANK_MASKS[0] | RANK_MASKS[7]):
+                code = color * 6 + (int(promotion) if promotion else QUEEN) - 1
+        elif ptype == KING:
+            self.castling &= 0b0011 if color else 0b1100
+            if abs(to_bit - from_bit) == 2:
+                f_bit, t_bit = (-2, 1) if to_bit % 8 == 2 else (1, -1)
+                f_bit += to_bit
+                t_bit += to_bit
+                self._put(t_bit, mailbox[f_bit])
+                self._put(f_bit, EMPTY)
+        if captured:
+            self.halfmove_clock = 0
+            if capture_bit != to_bit:
+                self._put(capture_bit, EMPTY)
+        # moving or capturing a rook on its home square loses that side's privilege
+        self.castling &= CASTLE_KEEP[from_bit] & CASTLE_KEEP[to_bit]
+        self._put(to_bit, code)
+        self._put(from_bit, EMPTY)
+        if color:
+            self.fullmove += 1
+        self.turn = COLORS[color ^ 1]
+        self.zobrist ^= self._state_key()
+
+    def pop(self):
+        """ undo the last pushed move and return it """
+        move, code, captured, capture_bit, castling, ep_bit, halfmove_clock, zobrist = self.states.pop()
+        from_bit, to_bit, _ = move
+        self._put(from_bit, code)
+        self._put(to_bit, EMPTY)
+        if captured:
+            self._put(capture_bit, captured)
+        color, ptype = CODE_INDICES[code]
+        if ptype == KING and abs(to_bit - from_bit) == 2:
             f_bit, t_bit = (-2, 1) if to_bit % 8 == 2 else (1, -1)
             f_bit += to_bit
             t_bit += to_bit
-            self[t_bit] = self[f_bit]
-            self[f_bit] = None
-        elif to_bit == 0 or from_bit == 0:
-            self.castle[Color.DARK] &= 0b01
-        elif to_bit == 7 or from_bit == 7:
-            self.castle[Color.DARK] &= 0b10
-        elif to_bit == 56 or from_bit == 56:
-            self.castle[Color.LIGHT] &= 0b01
-        elif to_bit == 63 or from_bit == 63:
-            self.castle[Color.LIGHT] &= 0b10
-        c = self[to_bit]
-        self[to_bit] = self[from_bit]
-        self[from_bit] = None
-        self.turn = ~self.turn
+            self._put(f_bit, self.mailbox[t_bit])
+            self._put(t_bit, EMPTY)
+        self.castling = castling
+        self.ep_bit = ep_bit
+        self.halfmove_clock = halfmove_clock
+        if color:
+            self.fullmove -= 1
+        self.turn = COLORS[color]
+        self.zobrist = zobrist
+        return move
+
+    def repetitions(self, stop_at=None):
+        """ times the current position has occurred in this game, counting the current one
+
+        Board.states keeps the zobrist key and halfmove clock from before every ply, so this reads
+        only the halfmove_clock records since the last capture or pawn move (and of those only
+        every other one: the side to move must match). Stops counting once `stop_at` is reached.
+        """
+        states = self.states
+        key = self.zobrist
+        count = 1
+        stop = max(len(states) - self.halfmove_clock, 0)
+        for i in range(len(states) - 2, stop - 1, -2):
+            if states[i][7] == key:
+                count += 1
+                if count == stop_at:
+                    break
+        return count
+
+    def is_repetition(self, count=3):
+        """ has the current position occurred at least `count` times """
+        return self.repetitions(count) >= count
+
+    def is_fifty_moves(self):
+        """ fifty moves by each side without a capture or pawn move """
+        return self.halfmove_clock >= FIFTY_MOVE_PLIES
+
+    def can_claim_draw(self):
+        """ threefold repetition or the fifty-move rule """
+        return self.is_fifty_moves() or self.is_repetition(3)
+
+    def copy(self):
+        """ copy of the position, including the moves that can be undone with pop() """
+        board = self.__class__.__new__(self.__class__)
+        board.turn = self.turn
+        board.halfmove_clock = self.halfmove_clock
+        board.fullmove = self.fullmove
+        board.ep_bit = self.ep_bit
+        board.castling = self.castling
+        board.states = list(self.states)
+        board.movestatus = MoveStatus(0)
+        board.error_msg = None
+        board.error = False
+        board.masks = list(self.masks)
+        board.mailbox = bytearray(self.mailbox)
+        board.zobrist = self.zobrist
+        board.mg = self.mg
+        board.eg = self.eg
+        board.phase = self.phase
+        return board
+
+    @classmethod
+    def from_fen(cls, fen):
+        """ build a board from Forsyth-Edwards Notation """
+        board = cls.__new__(cls)
+        board.set_fen(fen)
+        return board
+
+    def set_fen(self, fen):
+        """ load a position from Forsyth-Edwards Notation into this board, replacing everything """
+        fields = fen.split()
+        if not fields:
+            raise ValueError("empty FEN")
+        masks = [0] * 9
+        mailbox = bytearray(64)
+        zobrist = 0
+        ranks = fields[0].split("/")
+        if len(ranks) != 8:
+            raise ValueError("FEN does not describe 8 ranks: {}".format(fen))
+        for rank, text in enumerate(ranks):
+            if sum(int(char) if char.isdigit() else 1 for char in text) != 8:
+                raise ValueError("rank {} {!r} does not cover 8 squares in FEN: {}".format(8 - rank, text, fen))
+            bit = rank * 8
+            for char in text:
+                if char.isdigit():
+                    bit += int(char)
+                    continue
+                code = CODE_CHARS.find(char)
+                if code < 1:
+                    raise ValueError("invalid piece {!r} in FEN: {}".format(char, fen))
+                mailbox[bit] = code
+                zobrist ^= ZOBRIST_PIECES[code - 1][bit]
+                color, index = CODE_INDICES[code]
+                masks[color] |= 1 << bit
+                masks[index] |= 1 << bit
+                bit += 1
+        masks[ALL] = masks[LIGHT] | masks[DARK]
+        fields += ["w", "-", "-"][len(fields) - 1:]
+        if fields[1] not in ("w", "b"):
+            raise ValueError("invalid side to move in FEN: {}".format(fen))
+        self.turn = COLORS[fields[1] == "b"]
+        castling = sum(1 << i for i, char in enumerate("KQkq") if char in fields[2])
+        # drop rights whose king or rook isn't on its home square
+        for i, (king, rook, code) in enumerate(CASTLE_HOMES):
+            if mailbox[king] != code or mailbox[rook] != code + 2:
+                castling &= ~(1 << i)
+        self.castling = castling
+        try:
+            self.ep_bit = None if fields[3] == "-" else parse_square(fields[3])
+        except ValueError:
+            raise ValueError("invalid en passant square {!r} in FEN: {}".format(fields[3], fen)) from None
+        if self.ep_bit is not None and self.ep_bit // 8 != (5 if self.turn else 2):
+            raise ValueError("en passant square {} is not on the {} rank in FEN: {}".format(
+                fields[3], "3rd" if self.turn else "6th", fen))
+        # EPD has operations (e.g. "bm Bb5") where FEN has the clocks
+        clocks = fields[4:6]
+        self.halfmove_clock = int(clocks[0]) if clocks[:1] and clocks[0].isdigit() else 0
+        self.fullmove = int(clocks[1]) if len(clocks) == 2 and "".join(clocks).isdigit() else 1
+        self.states = []
+        self.movestatus = MoveStatus(0)
+        self.error_msg = None
+        self.error = False
+        self.masks = masks
+        self.mailbox = mailbox
+        self.zobrist = zobrist ^ self._state_key()
+        self.mg, self.eg, self.phase = self._eval_terms()
+
+    def fen(self):
+        """ Forsyth-Edwards Notation of this position """
+        rows = []
+        for r in range(8):
+            row = []
+            empty = 0
+            for code in self.mailbox[r * 8:r * 8 + 8]:
+                if code:
+                    if empty:
+                        row.append(str(empty))
+                        empty = 0
+                    row.append(CODE_CHARS[code])
+                else:
+                    empty += 1
+            if empty:
+                row.append(str(empty))
+            rows.append("".join(row))
+        castling = "".join(char for i, char in enumerate("KQkq") if self.castling >> i & 1)
+        return "{} {} {} {} {} {}".format(
+                "/".join(rows),
+                "b" if self.turn else "w",
+                castling or "-",
+                "-" if self.ep_bit is None else square_name(self.ep_bit),
+                self.halfmove_clock,
+                self.fullmove,
+                )
+
+    def perft(self, depth):
+        """ count leaf nodes of the legal move tree `depth` plies deep """
+        if depth <= 0:
+            return 1
+        moves = list(self.legal_moves())
+        if depth == 1:
+            return len(moves)
+        nodes = 0
+        for move in moves:
+            self.push(move)
+            nodes += self.perft(depth - 1)
+            self.pop()
+        return nodes
+
+    def perft_divide(self, depth):
+        """ perft node counts per root move """
+        counts = {}
+        for move in list(self.legal_moves()):
+            self.push(move)
+            counts[move] = self.perft(depth - 1)
+            self.pop()
+        return counts
 
     def __iter__(self):
-        for bit in range(64):
-            yield self[bit]
+        for code in self.mailbox:
+            yield PIECES[code]
 
     def __getitem__(self, bit):
-        mask = 1 << bit
-        if mask in self.bbs[Color.LIGHT]:
-            color = Color.LIGHT
-        elif mask in self.bbs[Color.DARK]:
-            color = Color.DARK
-        else:
-            return None
-        for pt in PieceType:
-            if mask in self.bbs[pt]:
-                return Piece(color, pt)
+        return PIECES[self.mailbox[bit]]
 
     def __setitem__(self, bit, piece):
-        for pt in PieceType:
-            self.bbs[pt][bit] = 0
-        if piece is None:
-            self.bbs[Color.LIGHT][bit] = 0
-            self.bbs[Color.DARK][bit]  = 0
-        else:
-            self.bbs[piece.color][bit]  = 1
-            self.bbs[~piece.color][bit] = 0
-            self.bbs[piece.piecetype][bit] = 1
+        self._put(bit, piece.code if piece is not None else EMPTY)
+
+    def _put(self, bit, code):
+        """ place the piece with mailbox `code` (or EMPTY) on `bit` """
+        mask = 1 << bit
+        masks = self.masks
+        old = self.mailbox[bit]
+        if old:
+            self.zobrist ^= ZOBRIST_PIECES[old - 1][bit]
+            self.mg -= MG_SCORES[old][bit]
+            self.eg -= EG_SCORES[old][bit]
+            self.phase -= PHASES[old]
+            color, index = CODE_INDICES[old]
+            keep = ~mask
+            masks[color] &= keep
+            masks[index] &= keep
+            masks[ALL] &= keep
+        self.mailbox[bit] = code
+        if code:
+            self.zobrist ^= ZOBRIST_PIECES[code - 1][bit]
+            self.mg += MG_SCORES[code][bit]
+            self.eg += EG_SCORES[code][bit]
+            self.phase += PHASES[code]
+            color, index = CODE_INDICES[code]
+            masks[color] |= mask
+            masks[index] |= mask
+            masks[ALL] |= mask
 
     def __str__(self):
-        lines = []
-        for r in range(8):
-            line = []
-            for c in range(8):
-                p = self[r * 8 + c]
-                line.append(p.get_char() if p else "_")
-            lines.append(" ".join(line))
-        return "\n".join(lines)
+        chars = [CODE_CHARS[code] for code in self.mailbox]
+        return "\n".join(" ".join(chars[r * 8:r * 8 + 8]) for r in range(8))
+
+
+def iter_fens(path, reuse=False):
+    """ yield a Board for each FEN line in the file at `path`
+
+    Lines are read one at a time, so memory stays bounded for any file size. Blank lines,
+    lines starting with "#" and anything after a ";" are ignored, and so are EPD operations
+    (e.g. "bm Bb5;") in place of the clocks, which then default to 0 and 1.
+    With `reuse`, the same Board is reloaded and yielded for every line; copy() it to keep it.
+    """
+    board = Board.__new__(Board) if reuse else None
+    with open(path) as f:
+        for lineno, line in enumerate(f, 1):
+            fen = line.split(";", 1)[0].strip()
+            if not fen or fen.startswith("#"):
+                continue
+            try:
+                if reuse:
+                    board.set_fen(fen)
+                else:
+                    board = Board.from_fen(fen)
+            except ValueError as e:
+                raise ValueError("{}:{}: {}".format(path, lineno, e)) from None
+            yield board
 
 
+def __getattr__(name):
+    # BoardBatch needs numpy, which is optional; import it only when asked for
+    if name == "BoardBatch":
+        from chess_box.batch import BoardBatch
+        return BoardBatch
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
@@ -0,0 +1,416 @@
+# -*- coding: utf-8 -*-
+""" alpha-beta search on chess.Board
+
+Negamax with iterative deepening, a quiescence search over captures, move ordering (hash move,
+MVV-LVA captures, killer moves and a history table) and a fixed-size transposition table keyed
+by Board.zobrist. Searches stop on depth, node or time limits, or when stop() is called.
+"""
+
+import argparse
+from collections import namedtuple
+import sys
+import time
+
+from chess_box import chess
+from chess_box.chess import PAWN, CODE_INDICES, PieceType
+
+MATE = 30000
+# scores beyond this are mates; they are stored in the table relative to the node, not the root
+MATE_BOUND = MATE - 1000
+INF = 32000
+MAX_PLY = 64
+
+# indexed by int(PieceType); used to order captures
+PIECE_VALUES = (0, 0, 20000, 900, 500, 330, 320, 100)
+PIECE_TYPES = (None, None) + tuple(PieceType)
+
+# transposition table bound types
+EXACT, LOWER, UPPER = 0, 1, 2
+
+def encode_move(move):
+    from_bit, to_bit, promotion = move
+    return from_bit | to_bit << 6 | (int(promotion) if promotion else 0) << 12
+
+def decode_move(code):
+    return chess.Move(code & 63, (code >> 6) & 63, PIECE_TYPES[code >> 12])
+
+class TranspositionTable():
+    """ fixed-size table of search results keyed by Board.zobrist
+
+    Entries are two uint64 slots: the key xor'd with the packed data, then the data, so a torn
+    write (e.g. another process sharing `buffer`) reads back as a miss instead of a wrong hit.
+    A slot is replaced when it holds a result from an earlier search or one searched no deeper.
+    """
+    def __init__(self, size_mb=16, buffer=None):
+        if buffer is None:
+            buffer = bytearray(size_mb << 20)
+        entries = 1
+        while entries * 32 <= len(buffer):
+            entries *= 2
+        self.buffer = buffer
+        self.slots = memoryview(buffer)[:entries * 16].cast("Q")
+        self.mask = entries - 1
+        self.generation = 0
+
+    def __len__(self):
+        return self.mask + 1
+
+    def clear(self):
+        size = len(self.slots) * 8
+        memoryview(self.buffer)[:size] = bytes(size)
+
+    def new_search(self):
+        self.generation = (self.generation + 1) & 63
+
+    def probe(self, key):
+        """ (move code, score, depth, bound) stored for `key`, or None """
+        i = (key & self.mask) << 1
+        data = self.slots[i + 1]
+        if self.slots[i] ^ data != key:
+            return None
+        return data & 0xFFFF, ((data >> 16) & 0xFFFF) - 32768, (data >> 32) & 0xFF, (data >> 40) & 3
+
+    def store(self, key, move_code, score, depth, bound):
+        i = (key & self.mask) << 1
+        slots = self.slots
+        old = slots[i + 1]
+        same = slots[i] ^ old == key
+        if old and (old >> 42) == self.generation and (old >> 32) & 0xFF > depth and bound != EXACT:
+            return
+        if same and not move_code:
+            move_code = old & 0xFFFF
+        data = (move_code | (score + 32768) << 16 | min(depth, 255) << 32 | bound << 40
+                | self.generation << 42)
+        slots[i] = key ^ data
+        slots[i + 1] = data
+
+class SearchStopped(Exception):
+    pass
+
+class SearchResult(namedtuple("SearchResult", ("move", "score", "depth", "nodes", "seconds", "pv"))):
+    """ best move, score in centipawns for the side to move, completed depth, nodes, time and pv """
+    __slots__ = ()
+
+    @property
+    def nps(self):
+        return int(self.nodes / self.seconds) if self.seconds > 0 else 0
+
+    @property
+    def mate(self):
+        """ moves to mate (negative when getting mated), or None """
+        if abs(self.score) < MATE_BOUND:
+            return None
+        plies = MATE - abs(self.score)
+        return (plies + 1) // 2 if self.score > 0 else -(plies // 2)
+
+class Engine():
+    def __init__(self, tt_mb=16, tt=None, tablebase=None):
+        self.tt = tt if tt is not None else TranspositionTable(tt_mb)
+        # tablebase.Tablebase giving exact scores for the endings it covers
+        self.tablebase = tablebase
+        self.stopped = False
+        # anything with is_set() (threading/multiprocessing Event) that stops the search when set
+        self.stop_event = None
+        self.nodes = 0
+        self.killers = [[None, None] for _ in range(MAX_PLY + 1)]
+        self.history = [[0] * 4096, [0] * 4096]
+
+    def stop(self):
+        """ ask a running search (e.g. on another thread) to return as soon as possible """
+        self.stopped = True
+
+    def search(self, board, depth=None, nodes=None, movetime=None, info=None, root_moves=None):
+        """ search `board` to `depth` plies, `nodes` nodes or `movetime` seconds and return a SearchResult
+
+        Without limits the search runs until stop() is called. `info`, if given, is called
+        with a SearchResult after every completed iteration. `root_moves` restricts the search
+        to some of the legal moves, tried in the given order. The board is left as it was.
+        """
+        self.stopped = False
+        self.nodes = 0
+        self.killers = [[None, None] for _ in range(MAX_PLY + 1)]
+        self.history = [[0] * 4096, [0] * 4096]
+        self.tt.new_search()
+        self.start = time.perf_counter()
+        self.deadline = None if movetime is None else self.start + movetime
+        # compared on every node, so a plain int even without a limit
+        self.node_limit = sys.maxsize if nodes is None else nodes
+        self.root_states = len(board.states)
+        max_depth = min(depth or MAX_PLY, MAX_PLY)
+
+        moves = list(board.legal_moves())
+        if root_moves is not None:
+            moves = [move for move in root_moves if move in moves]
+        if not moves:
+            score = -MATE if board.in_check() else 0
+            return SearchResult(None, score, 0, 0, 0.0, [])
+        result = SearchResult(moves[0], 0, 0, 0, 0.0, [moves[0]])
+        for d in range(1, max_depth + 1):
+            try:
+                score, best = self._root(board, moves, d)
+            except SearchStopped:
+                while len(board.states) > self.root_states:
+                    board.pop()
+                break
+            # keep the best move first for the next iteration
+            moves.remove(best)
+            moves.insert(0, best)
+            result = SearchResult(best, score, d, self.nodes, time.perf_counter() - self.start,
+                    self.principal_variation(board, best))
+            if info is not None:
+                info(result)
+            if abs(score) >= MATE_BOUND and MATE - abs(score) <= d:
+                break
+        return result._replace(nodes=self.nodes, seconds=time.perf_counter() - self.start)
+
+    def principal_variation(self, board, first):
+        """ follow the transposition table from `first` """
+        pv = [first]
+        board.push(first)
+        seen = {board.zobrist}
+        while len(pv) < MAX_PLY:
+            entry = self.tt.probe(board.zobrist)
+            if entry is None or not entry[0]:
+                break
+            move = decode_move(entry[0])
+            if move not in board.legal_moves():
+                break
+            pv.append(move)
+            board.push(move)
+            if board.zobrist in seen:
+                break
+            seen.add(board.zobrist)
+        for _ in pv:
+            board.pop()
+        return pv
+
+    def _check_limits(self):
+        if self.stopped or (self.stop_event is not None and self.stop_event.is_set()):
+            raise SearchStopped
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchStopped
+
+    def _root(self, board, moves, depth):
+        alpha, beta = -INF, INF
+        best = moves[0]
+        for move in moves:
+            board.push(move)
+            if best is move:
+                score = -self._search(board, depth - 1, -beta, -alpha, 1)
+            else:
+                # null window first; only re-search moves that may beat the best one
+                score = -self._search(board, depth - 1, -alpha - 1, -alpha, 1)
+                if score > alpha:
+                    score = -self._search(board, depth - 1, -beta, -alpha, 1)
+            board.pop()
+            if score > alpha:
+                alpha = score
+                best = move
+        self.tt.store(board.zobrist, encode_move(best), alpha, depth, EXACT)
+        return alpha, best
+
+    def _is_draw(self, board):
+        # inside the search a single repetition is enough: the line can be repeated again
+        return board.is_fifty_moves() or board.is_repetition(2)
+
+    def _order(self, board, moves, hash_move, ply):
+        mailbox = board.mailbox
+        killers = self.killers[ply]
+        history = self.history[int(board.turn)]
+        ep_bit = board.ep_bit
+        keyed = []
+        for move in moves:
+            from_bit, to_bit, promotion = move
+            victim = mailbox[to_bit]
+            if move == hash_move:
+                key = 1 << 30
+            elif victim or promotion or (to_bit == ep_bit and CODE_INDICES[mailbox[from_bit]][1] == PAWN):
+                # most valuable victim, least valuable attacker
+                value = PIECE_VALUES[CODE_INDICES[victim][1]] if victim else PIECE_VALUES[PAWN]
+                if promotion:
+                    value += PIECE_VALUES[int(promotion)]
+                # type indices run from KING (2) to PAWN (7): cheaper attackers sort higher
+                key = (1 << 24) + value * 8 + CODE_INDICES[mailbox[from_bit]][1]
+            elif move == killers[0]:
+                key = (1 << 23) + 1
+            elif move == killers[1]:
+                key = 1 << 23
+            else:
+                key = history[from_bit << 6 | to_bit]
+            keyed.append((key, move))
+        keyed.sort(key=lambda item: item[0], reverse=True)
+        return [move for _, move in keyed]
+
+    def _search(self, board, depth, alpha, beta, ply):
+        self.nodes += 1
+        if self.nodes >= self.node_limit:
+            raise SearchStopped
+        if not self.nodes & 1023:
+            self._check_limits()
+        if self._is_draw(board):
+            return 0
+        if self.tablebase is not None:
+            probe = self.tablebase.probe(board)
+            if probe is not None:
+                if not probe.wdl:
+                    return 0
+                score = MATE - ply - probe.plies
+                return score if probe.wdl > 0 else -score
+        in_check = board.in_check()
+        if in_check:
+            depth += 1
+        if depth <= 0 or ply >= MAX_PLY:
+            return self._quiesce(board, alpha, beta, ply)
+
+        key = board.zobrist
+        hash_move = None
+        entry = self.tt.probe(key)
+        if entry is not None:
+            move_code, score, entry_depth, bound = entry
+            if move_code:
+                hash_move = decode_move(move_code)
+            if entry_depth >= depth:
+                if score >= MATE_BOUND:
+                    score -= ply
+                elif score <= -MATE_BOUND:
+                    score += ply
+                if (bound == EXACT or (bound == LOWER and score >= beta)
+                        or (bound == UPPER and score <= alpha)):
+                    return score
+
+        moves = list(board.legal_moves())
+        if not moves:
+            return -MATE + ply if in_check else 0
+        original_alpha = alpha
+        best_score = -INF
+        best = None
+        for move in self._order(board, moves, hash_move, ply):
+            board.push(move)
+            score = -self._search(board, depth - 1, -beta, -alpha, ply + 1)
+            board.pop()
+            if score > best_score:
+                best_score = score
+                best = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        if not board.mailbox[move[1]] and not move[2]:
+                            killers = self.killers[ply]
+                            if killers[0] != move:
+                                killers[1] = killers[0]
+                                killers[0] = move
+                            self.history[int(board.turn)][move[0] << 6 | move[1]] += depth * depth
+                        break
+
+        if best_score >= beta:
+            bound = LOWER
+        elif best_score > original_alpha:
+            bound = EXACT
+        else:
+            bound = UPPER
+        stored = best_score
+        if stored >= MATE_BOUND:
+            stored += ply
+        elif stored <= -MATE_BOUND:
+            stored -= ply
+        self.tt.store(key, encode_move(best), stored, depth, bound)
+        return best_score
+
+    def _quiesce(self, board, alpha, beta, ply):
+        """ search captures and promotions until the position is quiet """
+        self.nodes += 1
+        if self.nodes >= self.node_limit:
+            raise SearchStopped
+        if not self.nodes & 1023:
+            self._check_limits()
+        stand_pat = board.evaluate()
+        if stand_pat >= beta or ply >= MAX_PLY:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+        mailbox = board.mailbox
+        ep_bit = board.ep_bit
+        captures = [move for move in board.legal_moves() if mailbox[move[1]] or move[2]
+                or (move[1] == ep_bit and CODE_INDICES[mailbox[move[0]]][1] == PAWN)]
+        for move in self._order(board, captures, None, ply):
+            board.push(move)
+            score = -self._quiesce(board, -beta, -alpha, ply + 1)
+            board.pop()
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break
+        return alpha
+
+def format_score(result):
+    mate = result.mate
+    return "mate {}".format(mate) if mate is not None else "cp {}".format(result.score)
+
+def bench(depth, out=sys.stdout):
+    """ search the perft reference positions to `depth`; return (nodes, seconds) """
+    from chess_box.perft import REFERENCE_POSITIONS
+    total_nodes = 0
+    total_time = 0.0
+    for name, fen, _ in REFERENCE_POSITIONS:
+        result = Engine().search(chess.Board.from_fen(fen), depth=depth)
+        total_nodes += result.nodes
+        total_time += result.seconds
+        print("{:<12} {:>6} {:<10} {:>9} nodes {:>8} nps".format(
+            name, result.move.uci(), format_score(result), result.nodes, result.nps), file=out)
+    print("total {} nodes in {:.3f}s ({} nps)".format(
+        total_nodes, total_time, int(total_nodes / total_time) if total_time > 0 else 0), file=out)
+    return total_nodes, total_time
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="chessy-search",
+            description="search a position for the best move and report nodes/sec")
+    parser.add_argument("fen", nargs="?", default=chess.Board().fen(), help="position (default: initial position)")
+    parser.add_argument("-d", "--depth", type=int, help="plies to search")
+    parser.add_argument("-n", "--nodes", type=int, help="nodes to search")
+    parser.add_argument("-t", "--movetime", type=float, help="seconds to search")
+    parser.add_argument("--hash", type=int, default=16, help="transposition table size in MB (default: 16)")
+    parser.add_argument("--tablebase", metavar="DIRECTORY", help="endgame tables made by chessy-tablebase")
+    parser.add_argument("-w", "--workers", type=int, nargs="+", default=[1],
+            help="search processes sharing the hash table; --bench takes several counts (e.g. 1 2 4 8)")
+    parser.add_argument("--split", action="store_true", help="with several workers, split the root moves between them")
+    parser.add_argument("--bench", action="store_true",
+            help="search the perft reference positions to DEPTH (or MOVETIME with several workers)")
+    args = parser.parse_args(argv)
+
+    parallel = args.split or args.workers != [1]
+    if args.bench:
+        if parallel:
+            from chess_box.parallel import bench as bench_parallel
+            bench_parallel(args.workers, args.movetime or (None if args.depth else 1.0), args.depth, args.split)
+        else:
+            bench(args.depth or 4)
+        return 0
+    if len(args.workers) > 1:
+        parser.error("several worker counts only make sense with --bench")
+    try:
+        board = chess.Board.from_fen(args.fen)
+    except ValueError as e:
+        print("chessy-search: {}".format(e), file=sys.stderr)
+        return 2
+    if args.depth is None and args.nodes is None and args.movetime is None:
+        args.depth = 4
+
+    def info(result):
+        print("depth {} score {} nodes {} nps {} time {:.3f} pv {}".format(result.depth, format_score(result),
+            result.nodes, result.nps, result.seconds, " ".join(move.uci() for move in result.pv)))
+    if parallel:
+        from chess_box.parallel import ParallelSearch
+        with ParallelSearch(args.workers[0], args.hash, args.split) as search:
+            result = search.search(board, args.depth, args.nodes, args.movetime)
+        info(result)
+    else:
+        tablebase = None
+        if args.tablebase:
+            from chess_box.tablebase import Tablebase
+            tablebase = Tablebase(args.tablebase)
+        result = Engine(args.hash, tablebase=tablebase).search(board, args.depth, args.nodes, args.movetime, info)
+    print("bestmove {}".format(result.move.uci() if result.move else "(none)"))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+""" multi-process search sharing one transposition table
+
+A single process searching chess.Board is held to one core by the GIL, so ParallelSearch runs an
+Engine in each of a pool of worker processes. All of them use a TranspositionTable laid over the
+same multiprocessing.shared_memory block. There are two modes:
+
+- shared root (lazy SMP, the default): every worker searches the whole root and results found
+  by one worker are picked up by the others through the table. Each worker starts on a
+  different root move so they do not all walk the same tree in step. The first worker's
+  result is the answer; the others are stopped when it finishes.
+- split root: the root moves are dealt out between the workers, and the best-scoring worker
+  result is the answer.
+
+Table entries are written without locks; a torn entry fails its key check and reads as a miss.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from multiprocessing import shared_memory
+import os
+import time
+
+from chess_box import chess
+from chess_box.engine import MATE, Engine, TranspositionTable, SearchResult, format_score
+
+_worker = None
+
+def _init_worker(shm_name, stop_event):
+    global _worker
+    shm = shared_memory.SharedMemory(name=shm_name)
+    engine = Engine(tt=TranspositionTable(buffer=shm.buf))
+    engine.stop_event = stop_event
+    # keep the mapping alive as long as the engine uses it
+    _worker = (shm, engine)
+
+def _search(board, depth, nodes, movetime, root_moves):
+    engine = _worker[1]
+    return engine.search(board, depth, nodes, movetime, root_moves=root_moves)
+
+class ParallelSearch():
+    """ search with `workers` processes (default: all cores) sharing a `tt_mb` MB table """
+    def __init__(self, workers=None, tt_mb=64, split=False):
+        self.workers = workers or os.cpu_count() or 1
+        self.split = split
+        self.shm = shared_memory.SharedMemory(create=True, size=tt_mb << 20)
+        self.stop_event = multiprocessing.Event()
+        self.pool = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                initargs=(self.shm.name, self.stop_event))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.stop_event.set()
+        self.pool.shutdown()
+        self.shm.close()
+        self.shm.unlink()
+
+    def clear(self):
+        """ empty the shared transposition table (e.g. between games) """
+        self.shm.buf[:] = bytes(len(self.shm.buf))
+
+    def stop(self):
+        """ stop a running search() from another thread """
+        self.stop_event.set()
+
+    def search(self, board, depth=None, nodes=None, movetime=None):
+        """ like Engine.search(); `nodes` is the total over all workers and nodes in the result are summed """
+        start = time.perf_counter()
+        self.stop_event.clear()
+        moves = list(board.legal_moves())
+        if not moves:
+            return SearchResult(None, -MATE if board.in_check() else 0, 0, 0, 0.0, [])
+        workers = min(self.workers, len(moves)) if self.split else self.workers
+        limit = None if nodes is None else max(nodes // workers, 1)
+        if self.split:
+            # deal the moves round-robin, so every worker gets some of the likely good ones
+            shares = [moves[i::workers] for i in range(workers)]
+        else:
+            # same root, but each worker starts from a different move to spread the work early on
+            shares = [moves[i:] + moves[:i] for i in range(workers)]
+        futures = [self.pool.submit(_search, board, depth, limit, movetime, share) for share in shares]
+        if self.split:
+            results = [future.result() for future in futures]
+        else:
+            first = futures[0].result()
+            self.stop_event.set()
+            results = [first] + [future.result() for future in futures[1:]]
+        self.stop_event.clear()
+        best = results[0]
+        if self.split:
+            # scores from a deeper completed iteration beat any shallower score
+            best = max(results, key=lambda result: (result.depth, result.score))
+        return best._replace(nodes=sum(result.nodes for result in results),
+                seconds=time.perf_counter() - start)
+
+def bench(workers_list, movetime=1.0, depth=None, split=False, out=None):
+    """ aggregate nodes/sec over the perft reference positions for each worker count """
+    from chess_box.perft import REFERENCE_POSITIONS
+    rates = {}
+    for workers in workers_list:
+        total_nodes = 0
+        total_time = 0.0
+        with ParallelSearch(workers, split=split) as search:
+            for name, fen, _ in REFERENCE_POSITIONS:
+                search.clear()
+                result = search.search(chess.Board.from_fen(fen), depth=depth, movetime=movetime)
+                total_nodes += result.nodes
+                total_time += result.seconds
+                print("{} workers  {:<12} {:>6} {:<10} depth {:>2} {:>9} nodes {:>8} nps".format(
+                    workers, name, result.move.uci(), format_score(result), result.depth,
+                    result.nodes, result.nps), file=out)
+        rates[workers] = int(total_nodes / total_time) if total_time > 0 else 0
+        print("{} workers: {} nodes in {:.3f}s ({} nps)".format(
+            workers, total_nodes, total_time, rates[workers]), file=out)
+    return rates
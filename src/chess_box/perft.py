@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+import sys
+import time
+
+from chess_box import chess
+
+STARTING_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+# standard perft positions (https://www.chessprogramming.org/Perft_Results): name, fen, nodes per depth
+REFERENCE_POSITIONS = (
+        ("initial", STARTING_FEN,
+            (20, 400, 8902, 197281, 4865609, 119060324)),
+        ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+            (48, 2039, 97862, 4085603, 193690690)),
+        ("position 3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+            (14, 191, 2812, 43238, 674624, 11030083)),
+        ("position 4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+            (6, 264, 9467, 422333, 15833292)),
+        ("position 5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+            (44, 1486, 62379, 2103487, 89941194)),
+        ("position 6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+            (46, 2079, 89890, 3894594, 164075551)),
+        )
+
+
+def perft(fen, depth):
+    """ (nodes, seconds) for `depth` plies from `fen` """
+    board = chess.Board.from_fen(fen)
+    start = time.perf_counter()
+    nodes = board.perft(depth)
+    return nodes, time.perf_counter() - start
+
+
+def perft_divide(fen, depth):
+    """ ({move: nodes}, seconds) for `depth` plies from `fen` """
+    board = chess.Board.from_fen(fen)
+    start = time.perf_counter()
+    counts = board.perft_divide(depth)
+    return counts, time.perf_counter() - start
+
+
+def _nps(nodes, seconds):
+    return int(nodes / seconds) if seconds > 0 else 0
+
+
+def run_suite(depth, out=sys.stdout):
+    """ check every reference position up to `depth`; return number of mismatches """
+    failures = 0
+    total_nodes = 0
+    total_time = 0.0
+    for name, fen, expected in REFERENCE_POSITIONS:
+        for d, want in enumerate(expected[:depth], 1):
+            nodes, seconds = perft(fen, d)
+            total_nodes += nodes
+            total_time += seconds
+            ok = nodes == want
+            failures += not ok
+            print("{:<12} depth {} {:>12} {:>10} nps  {}".format(
+                name, d, nodes, _nps(nodes, seconds),
+                "ok" if ok else "FAIL (expected {})".format(want)), file=out)
+    print("total {} nodes in {:.3f}s ({} nps)".format(
+        total_nodes, total_time, _nps(total_nodes, total_time)), file=out)
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="chessy-perft",
+            description="count move generation leaf nodes and report nodes/sec")
+    parser.add_argument("fen", nargs="?", default=STARTING_FEN, help="position (default: initial position)")
+    parser.add_argument("-d", "--depth", type=int, default=4, help="plies to search (default: 4)")
+    parser.add_argument("--divide", action="store_true", help="print node counts per root move")
+    parser.add_argument("--suite", action="store_true",
+            help="check the reference positions up to DEPTH against their known node counts")
+    args = parser.parse_args(argv)
+
+    if args.suite:
+        return 1 if run_suite(args.depth) else 0
+    try:
+        if args.divide:
+            counts, seconds = perft_divide(args.fen, args.depth)
+            for move in sorted(counts, key=str):
+                print("{}: {}".format(move, counts[move]))
+            nodes = sum(counts.values())
+        else:
+            nodes, seconds = perft(args.fen, args.depth)
+    except ValueError as e:
+        print("chessy-perft: {}".format(e), file=sys.stderr)
+        return 2
+    print("nodes {} time {:.3f}s nps {}".format(nodes, seconds, _nps(nodes, seconds)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
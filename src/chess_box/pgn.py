@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+""" streaming Portable Game Notation reader
+
+Games are read one at a time from a binary file, so memory is bounded by the largest game,
+not the file. Each Game keeps the byte offset it starts at. map_games()/replay_file() can
+split a file into byte ranges aligned to game boundaries and work through them in a
+process pool.
+"""
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import os
+import re
+
+from chess_box import chess
+
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+TAG_RE = re.compile(r'^\[(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+# comments, variation parentheses, NAGs, move numbers, and everything else (SAN and results)
+TOKEN_RE = re.compile(r"\{[^}]*\}|;[^\n]*|[()]|\$\d+|\d+\.(?:\.\.)?|[^\s(){};]+")
+# a tag line right after a blank line starts a game
+GAME_START_RE = re.compile(rb"\n\r?\n\[")
+
+class PGNError(ValueError):
+    pass
+
+class Game():
+    def __init__(self, headers, moves, result, offset):
+        self.headers = headers  # tag name -> value
+        self.moves = moves      # mainline SAN strings
+        self.result = result    # result token from the movetext (or the Result tag)
+        self.offset = offset    # byte offset of the game in its file
+
+    def __repr__(self):
+        return "Game({} vs {}, {} plies at {})".format(
+                self.headers.get("White", "?"), self.headers.get("Black", "?"), len(self.moves), self.offset)
+
+    def initial_board(self):
+        fen = self.headers.get("FEN")
+        return chess.Board.from_fen(fen) if fen else chess.Board()
+
+    def replay(self, board=None):
+        """ play the mainline from the initial position (or `board`) and return the board """
+        if board is None:
+            board = self.initial_board()
+        for ply, san in enumerate(self.moves):
+            try:
+                move = board.parse_san(san)
+            except ValueError as e:
+                raise PGNError("game at byte {}, ply {}: {}".format(self.offset, ply + 1, e)) from None
+            # parse_san only returns legal moves, so there is nothing left for make_move to validate
+            board.push(move)
+        return board
+
+def _parse_movetext(text):
+    moves = []
+    result = None
+    depth = 0
+    for token in TOKEN_RE.findall(text):
+        first = token[0]
+        if first == "(":
+            depth += 1
+        elif first == ")":
+            depth = max(depth - 1, 0)
+        elif depth or first in "{;$" or token[-1] == ".":
+            continue
+        elif token in RESULTS:
+            result = token
+        else:
+            moves.append(token)
+    return moves, result
+
+def _read_games(f, offset=0, end=None):
+    """ yield Games from binary file `f` positioned at `offset`, stopping at games starting at `end` """
+    headers = {}
+    movetext = []
+    start = None
+    prev_blank = True
+    for line in iter(f.readline, b""):
+        pos = offset
+        offset += len(line)
+        text = line.decode("utf-8", "replace").strip()
+        match = TAG_RE.match(text) if text.startswith("[") else None
+        if match:
+            # tags after movetext, or after a blank line following tags, begin the next game
+            if movetext or (headers and prev_blank):
+                yield _game(headers, movetext, start)
+                headers, movetext, start = {}, [], None
+            if start is None:
+                if end is not None and pos >= end:
+                    return
+                start = pos
+            headers[match.group(1)] = match.group(2).replace('\\"', '"').replace("\\\\", "\\")
+        elif text and not text.startswith("%"):
+            if start is None:
+                if end is not None and pos >= end:
+                    return
+                start = pos
+            movetext.append(text)
+        prev_blank = not text
+    if headers or movetext:
+        yield _game(headers, movetext, start)
+
+def _game(headers, movetext, start):
+    moves, result = _parse_movetext("\n".join(movetext))
+    return Game(headers, moves, result or headers.get("Result", "*"), start)
+
+def iter_games(source):
+    """ lazily yield Games from a path or a binary file object """
+    if isinstance(source, (str, bytes, os.PathLike)):
+        with open(source, "rb") as f:
+            yield from _read_games(f)
+    else:
+        yield from _read_games(source, source.tell())
+
+def _align(f, offset):
+    """ offset of the first game starting at or after `offset` (None if there is none) """
+    if offset == 0:
+        return 0
+    # the "\n\r\n[" pattern can start up to three bytes before a game at `offset`
+    pos = max(offset - 3, 0)
+    f.seek(pos)
+    buf = b""
+    while True:
+        chunk = f.read(1 << 16)
+        if not chunk:
+            return None
+        buf += chunk
+        for match in GAME_START_RE.finditer(buf):
+            start = pos + match.end() - 1
+            if start >= offset:
+                return start
+        pos += len(buf) - 3
+        buf = buf[-3:]
+
+def split_ranges(path, parts):
+    """ split the file at `path` into at most `parts` (start, end) byte ranges on game boundaries """
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        starts = [_align(f, size * i // parts) for i in range(parts)]
+    starts = sorted(set(start for start in starts if start is not None))
+    return list(zip(starts, starts[1:] + [size]))
+
+def _map_range(args):
+    path, start, end, func = args
+    with open(path, "rb") as f:
+        f.seek(start)
+        return [func(game) for game in _read_games(f, start, end)]
+
+def map_games(path, func, processes=None, chunks_per_process=4):
+    """ yield func(game) for every game in the file at `path`, in file order
+
+    With processes other than 1, the file is split into byte ranges that worker processes
+    read and parse independently; `func` must be picklable (a module-level function).
+    """
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if processes == 1:
+        for game in iter_games(path):
+            yield func(game)
+        return
+    ranges = split_ranges(path, processes * chunks_per_process)
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        for results in pool.map(_map_range, ((path, start, end, func) for start, end in ranges)):
+            yield from results
+
+ReplayResult = namedtuple("ReplayResult", ("offset", "headers", "plies", "fen", "error"))
+
+def replay_game(game):
+    """ replay `game`, reporting the final position or the error that stopped it """
+    try:
+        board = game.replay()
+    except (PGNError, ValueError) as e:
+        return ReplayResult(game.offset, game.headers, len(game.moves), None, str(e))
+    return ReplayResult(game.offset, game.headers, len(game.moves), board.fen(), None)
+
+def replay_file(path, processes=None):
+    """ replay every game in the file at `path` across `processes` (default: all cores) """
+    return map_games(path, replay_game, processes)
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+""" byte-offset sidecar index for PGN databases
+
+The index is built with one pass over the PGN file and saved next to it (`<file>.idx`).
+After that it is memory-mapped, so game N is found in O(1) and header lookups cost
+O(log n) bisections instead of a rescan.
+
+Layout (native byte order, every section 8-byte aligned):
+    header      magic, byte order, game count, string count, PGN size and mtime
+    offsets     uint64 per game: byte offset of the game in the PGN file
+    columns     uint32 per game for each of FIELDS: id of the tag value in the string table
+    sorted      uint32 per game for each of FIELDS: game numbers ordered by (value id, game)
+    strings     uint64 offsets (count + 1) into a blob of sorted, unique UTF-8 tag values
+"""
+
+from array import array
+from collections import namedtuple
+import mmap
+import os
+import struct
+import sys
+
+from chess_box import pgn
+
+FIELDS = ("White", "Black", "Result", "ECO")
+MAGIC = b"CHESSYIX"
+HEADER = struct.Struct("=8s8sQQQd")
+
+IndexEntry = namedtuple("IndexEntry", ("offset",) + tuple(field.lower() for field in FIELDS))
+
+def index_path(pgn_path):
+    return "{}.idx".format(os.fspath(pgn_path))
+
+def _pad(n):
+    return -n % 8
+
+def build(pgn_path, path=None):
+    """ scan the PGN file at `pgn_path` and write its index to `path` (default: `<pgn_path>.idx`) """
+    path = path or index_path(pgn_path)
+    stat = os.stat(pgn_path)
+    offsets = array("Q")
+    values = [[] for _ in FIELDS]
+    for game in pgn.iter_games(pgn_path):
+        offsets.append(game.offset)
+        for column, field in zip(values, FIELDS):
+            column.append(game.headers.get(field, "?"))
+
+    strings = sorted(set(value for column in values for value in column))
+    ids = dict((value, i) for i, value in enumerate(strings))
+    columns = [array("I", (ids[value] for value in column)) for column in values]
+    orders = [array("I", sorted(range(len(offsets)), key=column.__getitem__)) for column in columns]
+    blob = b"".join(value.encode("utf-8") for value in strings)
+    string_offsets = array("Q", [0])
+    for value in strings:
+        string_offsets.append(string_offsets[-1] + len(value.encode("utf-8")))
+
+    tmp = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, sys.byteorder.encode().ljust(8, b"\0"),
+                len(offsets), len(strings), stat.st_size, stat.st_mtime))
+        for section in [offsets] + columns + orders + [string_offsets]:
+            data = section.tobytes()
+            f.write(data + b"\0" * _pad(len(data)))
+        f.write(blob)
+    os.replace(tmp, path)
+    return path
+
+def _first_game(order, column, string_id, lo=0):
+    """ position in `order` of the first game whose `column` id is >= `string_id` """
+    hi = len(order)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if column[order[mid]] < string_id:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+class PGNIndex():
+    """ memory-mapped index over a PGN file; use PGNIndex.open() to build it when needed """
+    def __init__(self, pgn_path, path=None):
+        self.pgn_path = pgn_path
+        self.path = path or index_path(pgn_path)
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._map()
+        except ValueError:
+            self._mm.close()
+            raise
+
+    def _map(self):
+        if len(self._mm) < HEADER.size:
+            raise ValueError("{}: truncated index".format(self.path))
+        magic, byteorder, count, nstrings, self.pgn_size, self.pgn_mtime = HEADER.unpack_from(self._mm)
+        if magic != MAGIC:
+            raise ValueError("{}: not a PGN index".format(self.path))
+        if byteorder.rstrip(b"\0").decode() != sys.byteorder:
+            raise ValueError("{}: index was written with another byte order".format(self.path))
+        view = memoryview(self._mm)
+        pos = HEADER.size
+
+        def section(fmt, n):
+            nonlocal pos
+            size = struct.calcsize(fmt) * n
+            if pos + size > len(view):
+                raise ValueError("{}: truncated index".format(self.path))
+            part = view[pos:pos + size].cast(fmt)
+            pos += size + _pad(size)
+            return part
+
+        self._offsets = section("Q", count)
+        self._columns = [section("I", count) for _ in FIELDS]
+        self._orders = [section("I", count) for _ in FIELDS]
+        self._string_offsets = section("Q", nstrings + 1)
+        self._blob = view[pos:]
+        if len(self._blob) != self._string_offsets[-1]:
+            raise ValueError("{}: truncated index".format(self.path))
+
+    @classmethod
+    def open(cls, pgn_path, path=None):
+        """ map the index for `pgn_path`, (re)building it if it is missing or stale """
+        path = path or index_path(pgn_path)
+        try:
+            index = cls(pgn_path, path)
+        except (OSError, ValueError):
+            pass
+        else:
+            if not index.stale():
+                return index
+            index.close()
+        build(pgn_path, path)
+        return cls(pgn_path, path)
+
+    def stale(self):
+        """ whether the PGN file changed since the index was built """
+        stat = os.stat(self.pgn_path)
+        return stat.st_size != self.pgn_size or stat.st_mtime != self.pgn_mtime
+
+    def close(self):
+        for part in [self._offsets, self._string_offsets, self._blob] + self._columns + self._orders:
+            part.release()
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def _string(self, i):
+        return bytes(self._blob[self._string_offsets[i]:self._string_offsets[i + 1]]).decode("utf-8")
+
+    def _string_id(self, value):
+        lo, hi = 0, len(self._string_offsets) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._string(mid) < value:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self._string_offsets) - 1 and self._string(lo) == value:
+            return lo
+        return None
+
+    def __getitem__(self, n):
+        if n < 0:
+            n += len(self)
+        if not 0 <= n < len(self):
+            raise IndexError("game {} out of range".format(n))
+        return IndexEntry(self._offsets[n], *(self._string(column[n]) for column in self._columns))
+
+    def game(self, n):
+        """ parse game `n` (0-based) straight from its byte offset """
+        offset = self[n].offset
+        end = self._offsets[n + 1] if n + 1 < len(self) else None
+        with open(self.pgn_path, "rb") as f:
+            f.seek(offset)
+            for game in pgn._read_games(f, offset, end):
+                return game
+        raise pgn.PGNError("no game at byte {}".format(offset))
+
+    def board(self, n, board=None):
+        """ chess.Board after the mainline of game `n` """
+        return self.game(n).replay(board)
+
+    def filter(self, **headers):
+        """ sorted game numbers whose tags match all of `headers`, e.g. filter(White="Tal", Result="1-0") """
+        matches = None
+        for field, value in headers.items():
+            if field not in FIELDS:
+                raise ValueError("{} is not indexed (indexed tags: {})".format(field, ", ".join(FIELDS)))
+            i = FIELDS.index(field)
+            string_id = self._string_id(value)
+            if string_id is None:
+                return []
+            column, order = self._columns[i], self._orders[i]
+            lo = _first_game(order, column, string_id)
+            hi = _first_game(order, column, string_id + 1, lo)
+            games = set(order[lo:hi])
+            matches = games if matches is None else matches & games
+            if not matches:
+                return []
+        return sorted(matches) if matches is not None else list(range(len(self)))
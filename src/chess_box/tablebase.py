@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+""" retrograde endgame tablebases for king and piece against king
+
+generate() builds a win/draw/loss and distance-to-mate table for KQvK, KRvK or KPvK. It
+enumerates every placement of the light king, the dark king and the light piece with either
+side to move, takes the moves from chess.Board.legal_moves(), and resolves the positions
+backwards from the mates: a position that can reach a lost position is won, and one whose
+moves all reach won positions is lost. Whatever is left at the end is drawn.
+
+Tables are stored one byte per position (see the value constants below) behind a short
+header, and Tablebase probes them through mmap. Positions with the piece on the dark side
+are answered from the same table with the colors swapped and the board flipped.
+"""
+
+from array import array
+import argparse
+from collections import namedtuple
+import mmap
+import os
+import pathlib
+import sys
+import time
+
+from chess_box import chess
+from chess_box.chess import LIGHT, DARK, KING, QUEEN, ROOK, PAWN, ALL, CODE_INDICES
+
+MAGIC = b"CHESSYTB"
+# material name -> piece type index of the light piece next to the two kings
+MATERIALS = {"KQvK": QUEEN, "KRvK": ROOK, "KPvK": PAWN}
+# tables a KPvK promotion leads to (bishops and knights can't mate: those promotions draw)
+PROMOTION_TABLES = {QUEEN: "KQvK", ROOK: "KRvK"}
+TABLE_SIZE = 2 * 64 ** 3
+
+# values: 0 draw, 1..127 side to move mates in that many plies,
+# 128..254 side to move is mated in (value - 128) plies, 255 not a legal position
+DRAW = 0
+LOSS = 128
+INVALID = 255
+
+Probe = namedtuple("Probe", ("wdl", "plies"))
+
+def index(turn, light_king, dark_king, piece):
+    return ((turn * 64 + light_king) * 64 + dark_king) * 64 + piece
+
+def _decode(value):
+    if value == INVALID:
+        return None
+    if value == DRAW:
+        return Probe(0, None)
+    if value < LOSS:
+        return Probe(1, value)
+    return Probe(-1, value - LOSS)
+
+def _successors(ptype, lookup):
+    """ legal flag, in-check flag, successor indices and resolved outcomes for every position
+
+    Outcomes of moves that leave the table (captures and promotions) are returned as values of
+    the position reached, from the point of view of the side to move there.
+    """
+    board = chess.Board.from_fen("8/8/8/8/8/8/8/8 w - - 0 1")
+    code = ptype - 1    # light piece of that type
+    legal = bytearray(TABLE_SIZE)
+    in_check = bytearray(TABLE_SIZE)
+    offsets = array("I", [0])
+    targets = array("I")
+    exits = {}
+    for turn in (LIGHT, DARK):
+        board.turn = chess.COLORS[turn]
+        for light_king in range(64):
+            for dark_king in range(64):
+                if dark_king == light_king or chess.KING_ATTACKS[light_king] >> dark_king & 1:
+                    offsets.extend([len(targets)] * 64)
+                    continue
+                for piece in range(64):
+                    i = index(turn, light_king, dark_king, piece)
+                    if (piece in (light_king, dark_king)
+                            or ptype == PAWN and (1 << piece) & (chess.RANK_MASKS[0] | chess.RANK_MASKS[7])):
+                        offsets.append(len(targets))
+                        continue
+                    for bit in (light_king, dark_king, piece):
+                        board._put(bit, chess.EMPTY)
+                    board._put(light_king, KING - 1)
+                    board._put(dark_king, KING + 5)
+                    board._put(piece, code)
+                    # the side that just moved can't be left in check
+                    board.turn = chess.COLORS[turn ^ 1]
+                    ok = not board.checkers()
+                    board.turn = chess.COLORS[turn]
+                    if ok:
+                        legal[i] = 1
+                        in_check[i] = bool(board.checkers())
+                        outside = []
+                        for move in board.legal_moves():
+                            from_bit, to_bit, promotion = move
+                            if to_bit in (light_king, dark_king, piece) and board.mailbox[to_bit]:
+                                # a capture leaves two bare kings
+                                outside.append(DRAW)
+                            elif promotion is not None:
+                                table = PROMOTION_TABLES.get(int(promotion))
+                                outside.append(DRAW if table is None else
+                                        lookup(table, index(turn ^ 1, light_king, dark_king, to_bit)))
+                            elif from_bit == light_king:
+                                targets.append(index(turn ^ 1, to_bit, dark_king, piece))
+                            elif from_bit == dark_king:
+                                targets.append(index(turn ^ 1, light_king, to_bit, piece))
+                            else:
+                                targets.append(index(turn ^ 1, light_king, dark_king, to_bit))
+                        if outside:
+                            exits[i] = outside
+                    board._put(light_king, chess.EMPTY)
+                    board._put(dark_king, chess.EMPTY)
+                    board._put(piece, chess.EMPTY)
+                    offsets.append(len(targets))
+    return legal, in_check, offsets, targets, exits
+
+def generate(name, lookup=None, log=None):
+    """ build the table for material `name` (e.g. "KQvK"); returns a bytearray of values
+
+    `lookup(name, index)` gives values of other tables, needed for KPvK promotions.
+    """
+    ptype = MATERIALS[name]
+    start = time.perf_counter()
+    legal, in_check, offsets, targets, exits = _successors(ptype, lookup)
+    if log:
+        log("{}: {} moves generated in {:.1f}s".format(name, len(targets), time.perf_counter() - start))
+
+    # predecessors: reverse the successor lists (counting sort on the target index)
+    counts = array("I", bytes(4 * (TABLE_SIZE + 1)))
+    for target in targets:
+        counts[target + 1] += 1
+    for i in range(TABLE_SIZE):
+        counts[i + 1] += counts[i]
+    fill = array("I", counts)
+    sources = array("I", bytes(4 * len(targets)))
+    for i in range(TABLE_SIZE):
+        for k in range(offsets[i], offsets[i + 1]):
+            target = targets[k]
+            sources[fill[target]] = i
+            fill[target] += 1
+
+    values = bytearray([INVALID]) * TABLE_SIZE
+    resolved = bytearray(TABLE_SIZE)
+    # moves per position that don't yet lead to a win for the opponent
+    remaining = array("I", (offsets[i + 1] - offsets[i] + len(exits.get(i, ())) for i in range(TABLE_SIZE)))
+    # positions won or lost at each ply, and "one more move leads to an opponent win" events
+    wins = {}
+    losses = {}
+    refuted = {}
+    for i in range(TABLE_SIZE):
+        if not legal[i]:
+            continue
+        values[i] = DRAW
+        if not remaining[i]:
+            if in_check[i]:
+                losses.setdefault(0, []).append(i)
+            continue
+        for value in exits.get(i, ()):
+            # values are for the opponent, who is to move after the exit
+            if LOSS <= value < INVALID:
+                wins.setdefault(value - LOSS + 1, []).append(i)
+            elif 0 < value < LOSS:
+                refuted.setdefault(value, []).append(i)
+
+    ply = 0
+    last = max([0] + list(wins) + list(refuted))
+    while ply <= last or ply in losses or ply in wins:
+        for i in losses.pop(ply, ()):
+            if resolved[i]:
+                continue
+            resolved[i] = 1
+            values[i] = LOSS + ply
+            for k in range(counts[i], counts[i + 1]):
+                wins.setdefault(ply + 1, []).append(sources[k])
+        for i in wins.pop(ply, ()):
+            if resolved[i]:
+                continue
+            resolved[i] = 1
+            values[i] = ply
+            for k in range(counts[i], counts[i + 1]):
+                refuted.setdefault(ply, []).append(sources[k])
+        for i in refuted.pop(ply, ()):
+            if resolved[i]:
+                continue
+            remaining[i] -= 1
+            if not remaining[i]:
+                losses.setdefault(ply + 1, []).append(i)
+        ply += 1
+    if log:
+        log("{}: solved to {} plies in {:.1f}s".format(name, ply - 1, time.perf_counter() - start))
+    return values
+
+def table_path(directory, name):
+    return pathlib.Path(directory) / "{}.tb".format(name)
+
+def write_table(path, name, values):
+    tmp = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + name.encode().ljust(8, b"\0"))
+        f.write(values)
+    os.replace(tmp, path)
+
+def generate_all(directory, names=None, log=None):
+    """ write tables for `names` (default: all) into `directory`; promotion targets come first """
+    names = list(names or MATERIALS)
+    for name in PROMOTION_TABLES.values():
+        if "KPvK" in names and name not in names and not table_path(directory, name).exists():
+            names.insert(0, name)
+    names.sort(key=lambda name: MATERIALS[name] == PAWN)
+    pathlib.Path(directory).mkdir(parents=True, exist_ok=True)
+    built = {}
+
+    def lookup(name, i):
+        if name not in built:
+            with Tablebase(directory) as tablebase:
+                built[name] = bytes(tablebase._table(name))
+        return built[name][i]
+    for name in names:
+        values = generate(name, lookup, log)
+        built[name] = values
+        write_table(table_path(directory, name), name, values)
+
+class Tablebase():
+    """ tables found in `directory`, memory-mapped on first use """
+    def __init__(self, directory):
+        self.directory = directory
+        self._maps = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for mm in self._maps.values():
+            if mm is not None:
+                mm.close()
+        self._maps = {}
+
+    def _table(self, name):
+        if name not in self._maps:
+            try:
+                with open(table_path(self.directory, name), "rb") as f:
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                mm = None
+            if mm is not None and (len(mm) != 16 + TABLE_SIZE or mm[:8] != MAGIC):
+                mm.close()
+                raise ValueError("{}: not a {} table".format(table_path(self.directory, name), name))
+            self._maps[name] = mm
+        mm = self._maps[name]
+        return None if mm is None else memoryview(mm)[16:]
+
+    def probe(self, board):
+        """ Probe(wdl, plies) for the side to move, or None if no table covers `board`
+
+        wdl is 1 (win), 0 (draw) or -1 (loss); plies is the distance to mate (None for draws).
+        """
+        masks = board.masks
+        occupied = masks[ALL]
+        if bin(occupied).count("1") != 3 or bin(masks[KING]).count("1") != 2:
+            return None
+        piece_mask = occupied & ~masks[KING]
+        piece = piece_mask.bit_length() - 1
+        color, ptype = CODE_INDICES[board.mailbox[piece]]
+        name = next((name for name, t in MATERIALS.items() if t == ptype), None)
+        if name is None or board.castling:
+            return None
+        table = self._table(name)
+        if table is None:
+            return None
+        light_king = (masks[LIGHT] & masks[KING]).bit_length() - 1
+        dark_king = (masks[DARK] & masks[KING]).bit_length() - 1
+        turn = int(board.turn)
+        if color:
+            # the piece is dark's: swap the colors and flip the board
+            light_king, dark_king, piece, turn = dark_king ^ 56, light_king ^ 56, piece ^ 56, turn ^ 1
+        return _decode(table[index(turn, light_king, dark_king, piece)])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="chessy-tablebase",
+            description="generate and probe king and piece against king endgame tables")
+    sub = parser.add_subparsers(dest="command", required=True)
+    gen = sub.add_parser("generate", help="build tables into DIRECTORY")
+    gen.add_argument("directory")
+    gen.add_argument("names", nargs="*", metavar="NAME",
+            help="materials to build: {} (default: all)".format(", ".join(MATERIALS)))
+    probe = sub.add_parser("probe", help="look a position up in the tables in DIRECTORY")
+    probe.add_argument("directory")
+    probe.add_argument("fen")
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        unknown = [name for name in args.names if name not in MATERIALS]
+        if unknown:
+            parser.error("unknown material {} (choose from {})".format(unknown[0], ", ".join(MATERIALS)))
+        generate_all(args.directory, args.names, log=print)
+        return 0
+    try:
+        board = chess.Board.from_fen(args.fen)
+    except ValueError as e:
+        print("chessy-tablebase: {}".format(e), file=sys.stderr)
+        return 2
+    with Tablebase(args.directory) as tablebase:
+        result = tablebase.probe(board)
+    if result is None:
+        print("not in the tables")
+        return 1
+    print({1: "win", 0: "draw", -1: "loss"}[result.wdl] +
+            ("" if result.plies is None else " in {} plies".format(result.plies)))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+""" Universal Chess Interface front end for the engine (no pygame)
+
+Commands are read on the main thread while searches run on a background thread, so "stop",
+"isready" and "quit" are answered straight away in the middle of a search.
+"""
+
+import sys
+import threading
+
+from chess_box import chess
+from chess_box.engine import Engine, format_score
+
+NAME = "Chessy"
+AUTHOR = "Violet McClure"
+DEFAULT_HASH = 16
+MAX_HASH = 1024
+# share of the remaining clock spent on a move when no movestogo is given
+DEFAULT_MOVESTOGO = 30
+
+class UCI():
+    def __init__(self, out=sys.stdout):
+        self.out = out
+        self.lock = threading.Lock()
+        self.engine = Engine(DEFAULT_HASH)
+        self.board = chess.Board()
+        self.thread = None
+        # set by "stop": ends a search, and lets an infinite search report its bestmove
+        self.stop_event = threading.Event()
+
+    def send(self, line):
+        with self.lock:
+            self.out.write(line + "\n")
+            self.out.flush()
+
+    def run(self, lines=sys.stdin):
+        for line in iter(lines.readline, ""):
+            if not self.command(line):
+                break
+        self.stop()
+
+    def command(self, line):
+        """ handle one line of input; returns False on "quit" """
+        tokens = line.split()
+        if not tokens:
+            return True
+        cmd, args = tokens[0], tokens[1:]
+        if cmd == "uci":
+            self.send("id name {}".format(NAME))
+            self.send("id author {}".format(AUTHOR))
+            self.send("option name Hash type spin default {} min 1 max {}".format(DEFAULT_HASH, MAX_HASH))
+            self.send("uciok")
+        elif cmd == "isready":
+            self.send("readyok")
+        elif cmd == "setoption":
+            self.setoption(args)
+        elif cmd == "ucinewgame":
+            self.stop()
+            self.engine.tt.clear()
+        elif cmd == "position":
+            self.stop()
+            self.position(args)
+        elif cmd == "go":
+            self.stop()
+            self.go(args)
+        elif cmd == "stop":
+            self.stop()
+        elif cmd == "ponderhit":
+            pass
+        elif cmd == "quit":
+            return False
+        elif cmd == "d":
+            self.send(str(self.board))
+            self.send("Fen: {}".format(self.board.fen()))
+        else:
+            self.send("info string unknown command {}".format(cmd))
+        return True
+
+    def setoption(self, args):
+        if "name" not in args:
+            return
+        words = args[args.index("name") + 1:]
+        value = None
+        if "value" in words:
+            i = words.index("value")
+            words, value = words[:i], " ".join(words[i + 1:])
+        if " ".join(words).lower() == "hash" and value is not None:
+            self.stop()
+            try:
+                size = min(max(int(value), 1), MAX_HASH)
+            except ValueError:
+                self.send("info string invalid Hash value {}".format(value))
+                return
+            self.engine = Engine(size)
+
+    def position(self, args):
+        if not args:
+            return
+        if "moves" in args:
+            i = args.index("moves")
+            args, moves = args[:i], args[i + 1:]
+        else:
+            moves = []
+        try:
+            if args[0] == "startpos":
+                board = chess.Board()
+            elif args[0] == "fen":
+                board = chess.Board.from_fen(" ".join(args[1:]))
+            else:
+                raise ValueError("expected startpos or fen")
+            for text in moves:
+                move = chess.Move.from_uci(text)
+                if move not in board.legal_moves():
+                    raise ValueError("illegal move {}".format(text))
+                board.push(move)
+        except (ValueError, IndexError) as e:
+            self.send("info string invalid position: {}".format(e))
+            return
+        self.board = board
+
+    def go(self, args):
+        limits = {"depth": None, "nodes": None, "movetime": None}
+        clock = {}
+        infinite = False
+        root_moves = None
+        i = 0
+        while i < len(args):
+            word = args[i]
+            try:
+                if word in ("depth", "nodes"):
+                    limits[word] = int(args[i + 1])
+                    i += 1
+                elif word == "movetime":
+                    limits["movetime"] = int(args[i + 1]) / 1000
+                    i += 1
+                elif word in ("wtime", "btime", "winc", "binc", "movestogo"):
+                    clock[word] = int(args[i + 1])
+                    i += 1
+                elif word == "infinite":
+                    infinite = True
+                elif word == "searchmoves":
+                    root_moves = []
+                    while i + 1 < len(args) and args[i + 1] not in ("depth", "nodes", "movetime",
+                            "wtime", "btime", "winc", "binc", "movestogo", "infinite", "ponder"):
+                        root_moves.append(chess.Move.from_uci(args[i + 1]))
+                        i += 1
+            except (ValueError, IndexError):
+                self.send("info string invalid go argument {}".format(word))
+                return
+            i += 1
+        if not infinite and limits["movetime"] is None:
+            side = "btime" if self.board.turn else "wtime"
+            if side in clock:
+                increment = clock.get("binc" if self.board.turn else "winc", 0)
+                budget = clock[side] / clock.get("movestogo", DEFAULT_MOVESTOGO) + increment / 2
+                # keep a margin for move overhead
+                limits["movetime"] = max(min(budget, clock[side] - 50), 10) / 1000
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._search, daemon=True,
+                args=(self.board.copy(), limits, infinite, root_moves))
+        self.thread.start()
+
+    def _search(self, board, limits, infinite, root_moves):
+        engine = self.engine
+        engine.stop_event = self.stop_event
+        result = engine.search(board, info=self._info, root_moves=root_moves, **limits)
+        if infinite:
+            # "go infinite" must not answer before "stop", even if the search ran out
+            self.stop_event.wait()
+        if result.move is None:
+            self.send("bestmove 0000")
+        else:
+            self.send("bestmove {}".format(result.move.uci()))
+
+    def _info(self, result):
+        self.send("info depth {} score {} nodes {} nps {} time {} pv {}".format(
+            result.depth, format_score(result), result.nodes, result.nps, int(result.seconds * 1000),
+            " ".join(move.uci() for move in result.pv)))
+
+    def stop(self):
+        """ stop a running search and wait for its bestmove """
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+
+def main():
+    UCI().run()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,25 +1,33 @@
 # -*- coding: utf-8 -*-
+""" pygame front end
 
-# fixes ALSA buffer underrun issues on archlinux regarding pygame font initialization
-import sys
-if sys.platform[:5] == "linux":
-    import os
-    os.environ['SDL_AUDIODRIVER'] = 'dsp'
+No assets are loaded on import: pygame is initialized and the fonts, labels and piece sprites
+are built when a UI is created, converted to the display's pixel format. The pieces are
+read from a single sprite atlas kept in the cache directory, rebuilt from the PNGs in
+pieces/ whenever those change.
+"""
 
-from chess_box import chess
 import enum
+import functools
+import os
 import pathlib
+import sys
+import zlib
+
 import pygame
-import time
 
-pygame.init()
-pygame.font.init()
+from chess_box import chess
+from chess_box.cache import cache_dir
+from chess_box.engine import format_score
+from chess_box.worker import EngineWorker
 
-# dimensions and padding
+# dimensions and padding (for the default SQUARE_SIZE; everything scales with the squares)
 SQUARE_SIZE = (60, 60)
 PAD = 8
 CURSOR_PAD = 5
 ID_PAD = 30
+MIN_SQUARE = 20             # squares don't shrink below this when the window is resized
+ASSET_CACHE_SIZE = 4        # scaled asset sets kept for recently used square sizes
 # colors
 BG_COLOR = (104, 74, 50)
 SQUARE_COLORS = [ (240, 217, 181), (181, 136, 99) ]
@@ -32,80 +40,162 @@ GHOST_ALPHA = 102
 # delay
 REPEAT_DELAY = 0.2
 REPEAT_WAIT = 0.05
+# seconds between polls of the engine process while it searches
+ENGINE_POLL = 0.05
+# seconds the computer thinks per move
+ENGINE_MOVETIME = 1.0
 # pygame keys
 UP_KEYS = (pygame.K_UP, pygame.K_k)
 RIGHT_KEYS = (pygame.K_RIGHT, pygame.K_l)
 DOWN_KEYS = (pygame.K_DOWN, pygame.K_j)
 LEFT_KEYS = (pygame.K_LEFT, pygame.K_h)
-# font
-FONT = pygame.font.Font(str(pathlib.Path(__file__).with_name("ubuntu_font")/"Ubuntu-R.ttf"), 30)
-ID_RANKS = tuple(FONT.render(str(n+1), True, FONT_COLOR) for n in range(7, -1, -1))
-ID_FILES = tuple(FONT.render(chr(n), True, FONT_COLOR) for n in range(ord('A'), ord('H')+1))
-MSG_FONT = pygame.font.Font(str(pathlib.Path(__file__).with_name("ubuntu_font")/"Ubuntu-R.ttf"), 18)
-
-PIECES = {}
-GHOSTS = {}
-def _get_pieces(path):
-    for pt in chess.PieceType:
-        for c in chess.Color:
+ANALYZE_KEY = pygame.K_a    # toggle background analysis of the current position
+COMPUTER_KEY = pygame.K_c   # toggle the computer playing the side to move
+# timer events
+REPEAT_EVENT = pygame.USEREVENT         # held direction key repeats
+ENGINE_EVENT = pygame.USEREVENT + 1     # engine updates may be waiting
+# assets
+FONT_PATH = pathlib.Path(__file__).with_name("ubuntu_font")/"Ubuntu-R.ttf"
+PIECES_DIR = pathlib.Path(__file__).with_name("pieces")
+
+def scaled(value, side):
+    """ `value`, a length in pixels for the default SQUARE_SIZE, for squares of `side` pixels """
+    return max(1, round(value * side / SQUARE_SIZE[0]))
+
+def board_size(side):
+    """ window size that fits the board with squares of `side` pixels """
+    edge = 8 * side + 2 * scaled(PAD, side) + 2 * scaled(ID_PAD, side)
+    return (edge, edge)
+
+def square_side(size):
+    """ largest square side whose board fits in a window of `size` (at least MIN_SQUARE) """
+    side = int(min(size) / (8 + 2 * (PAD + ID_PAD) / SQUARE_SIZE[0]))
+    while side > MIN_SQUARE and max(board_size(side)) > min(size):
+        side -= 1
+    return max(side, MIN_SQUARE)
+
+def _init_pygame():
+    # fixes ALSA buffer underrun issues on archlinux regarding pygame font initialization
+    if sys.platform[:5] == "linux":
+        os.environ['SDL_AUDIODRIVER'] = 'dsp'
+    pygame.init()
+    pygame.font.init()
+
+def atlas_path(path=PIECES_DIR):
+    """ piece sprite atlas cache file, named after the size and modification time of the PNGs """
+    stats = [(img.name, img.stat().st_size, img.stat().st_mtime_ns) for img in sorted(path.glob("*.png"))]
+    key = zlib.crc32(repr((stats, SQUARE_SIZE)).encode())
+    return cache_dir() / "pieces-{:08x}.png".format(key)
+
+def _load_atlas(path=PIECES_DIR):
+    """ one surface holding every piece: a row per color, a column per PieceType """
+    cache = atlas_path(path)
+    try:
+        return pygame.image.load(str(cache))
+    except (OSError, pygame.error):
+        pass
+    w, h = SQUARE_SIZE
+    atlas = pygame.Surface((w * len(chess.PieceType), h * len(chess.Color)), pygame.SRCALPHA)
+    for x, pt in enumerate(chess.PieceType):
+        for y, c in enumerate(chess.Color):
+            atlas.blit(pygame.image.load(str(path/"{}_{}.png".format(pt, c))), (x * w, y * h))
+    # best effort, like the slider table cache
+    try:
+        cache.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache.with_name("{}.{}.tmp.png".format(cache.stem, os.getpid()))
+        pygame.image.save(atlas, str(tmp))
+        os.replace(tmp, cache)
+    except (OSError, pygame.error):
+        pass
+    return atlas
+
+def _get_pieces(side):
+    """ (pieces, ghosts): display-format piece sprites and their see-through copies for dragging """
+    atlas = _load_atlas().convert_alpha()
+    w, h = side, side
+    if (w, h) != SQUARE_SIZE:
+        atlas = pygame.transform.smoothscale(atlas, (w * len(chess.PieceType), h * len(chess.Color)))
+    pieces = {}
+    ghosts = {}
+    for x, pt in enumerate(chess.PieceType):
+        for y, c in enumerate(chess.Color):
             piece = chess.Piece(c, pt)
-            img_path = path/"{}_{}.png".format(pt, c)
-            image = pygame.image.load(str(img_path))
-            PIECES[piece] = image
-            surf = pygame.Surface(SQUARE_SIZE)
-            surf.fill((0, 255, 0))
-            surf.set_colorkey((0, 255, 0))
-            surf.blit(image, (0, 0))
-            surf.set_alpha(GHOST_ALPHA)
-            GHOSTS[piece] = surf
-_get_pieces(pathlib.Path(__file__).with_name("pieces"))
-
-SQUARES_RECTS = tuple(pygame.Rect((x, y), SQUARE_SIZE)
-        for y in range(ID_PAD + PAD, PAD + SQUARE_SIZE[1] * 8, SQUARE_SIZE[1])
-        for x in range(ID_PAD + PAD, PAD + SQUARE_SIZE[0] * 8, SQUARE_SIZE[0])
-        )
-
-def _get_squares():
+            pieces[piece] = atlas.subsurface((x * w, y * h, w, h))
+            ghost = pieces[piece].copy()
+            ghost.fill((255, 255, 255, GHOST_ALPHA), special_flags=pygame.BLEND_RGBA_MULT)
+            ghosts[piece] = ghost
+    return pieces, ghosts
+
+def _get_squares(side):
+    # indexed like Color: light, dark
     sq_surfs = (
-        pygame.Surface(SQUARE_SIZE),
-        pygame.Surface(SQUARE_SIZE)
+        pygame.Surface((side, side)),
+        pygame.Surface((side, side))
     )
-    sq_surfs[int(chess.Color.LIGHT)].fill(SQUARE_COLORS[int(chess.Color.LIGHT)])
-    sq_surfs[int(chess.Color.DARK)].fill(SQUARE_COLORS[int(chess.Color.DARK)])
-    return sq_surfs
-SQUARES = _get_squares()
+    for surf, color in zip(sq_surfs, SQUARE_COLORS):
+        surf.fill(color)
+    return tuple(surf.convert() for surf in sq_surfs)
 
-def _get_cursor():
-    vsurf = pygame.Surface((CURSOR_PAD, SQUARE_SIZE[1]))
+def _get_cursor(side):
+    cursor_pad = scaled(CURSOR_PAD, side)
+    vsurf = pygame.Surface((cursor_pad, side))
     vsurf.fill(CURSOR_COLOR)
-    hsurf = pygame.Surface((SQUARE_SIZE[0] - 2 * CURSOR_PAD, CURSOR_PAD))
+    hsurf = pygame.Surface((side - 2 * cursor_pad, cursor_pad))
     hsurf.fill(CURSOR_COLOR)
-    cursor_surf = pygame.Surface(SQUARE_SIZE)
+    cursor_surf = pygame.Surface((side, side)).convert()
     cursor_surf.set_colorkey((0, 0, 0))
     cursor_surf.blit(vsurf, (0, 0))
-    cursor_surf.blit(vsurf, (SQUARE_SIZE[0] - CURSOR_PAD, 0))
-    cursor_surf.blit(hsurf, (CURSOR_PAD, 0))
-    cursor_surf.blit(hsurf, (CURSOR_PAD, SQUARE_SIZE[1] - CURSOR_PAD))
+    cursor_surf.blit(vsurf, (side - cursor_pad, 0))
+    cursor_surf.blit(hsurf, (cursor_pad, 0))
+    cursor_surf.blit(hsurf, (cursor_pad, side - cursor_pad))
     return cursor_surf
-CURSOR = _get_cursor()
 
-
-def _get_selected():
-    surf = pygame.Surface(SQUARE_SIZE)
+def _get_selected(side):
+    surf = pygame.Surface((side, side)).convert()
     surf.fill(SELECTED_COLOR)
     surf.set_alpha(SELECTED_ALPHA)
     return surf
-SELECTED = _get_selected()
 
+class Assets():
+    """ fonts and surfaces for drawing squares of `side` pixels; needs the display mode to be set """
+    def __init__(self, side):
+        font = pygame.font.Font(str(FONT_PATH), scaled(30, side))
+        self.ranks = tuple(font.render(str(n+1), True, FONT_COLOR).convert_alpha() for n in range(7, -1, -1))
+        self.files = tuple(font.render(chr(n), True, FONT_COLOR).convert_alpha() for n in range(ord('A'), ord('H')+1))
+        self.msg_font = pygame.font.Font(str(FONT_PATH), scaled(18, side))
+        self.pieces, self.ghosts = _get_pieces(side)
+        self.squares = _get_squares(side)
+        self.cursor = _get_cursor(side)
+        self.selected = _get_selected(side)
 
-def pos_to_index(x, y):
-    lpad = PAD + ID_PAD
-    tpad = PAD + ID_PAD
-    if (x < lpad or y < tpad or
-            x > lpad + 8 * SQUARE_SIZE[0] or y > tpad + 8 * SQUARE_SIZE[1]):
-        return None
-    xfloor, yfloor = (x - lpad) // SQUARE_SIZE[0], (y - tpad) // SQUARE_SIZE[1]
-    return xfloor + 8 * yfloor
+@functools.lru_cache(maxsize=ASSET_CACHE_SIZE)
+def get_assets(side):
+    """ Assets for squares of `side` pixels, scaled once per size """
+    return Assets(side)
+
+class Layout():
+    """ where everything goes for squares of `side` pixels, with the board centered in `size` """
+    def __init__(self, size, side):
+        self.side = side
+        self.pad = scaled(PAD, side)
+        self.id_pad = scaled(ID_PAD, side)
+        width, height = board_size(side)
+        self.origin = ((size[0] - width) // 2, (size[1] - height) // 2)
+        left = self.origin[0] + self.pad + self.id_pad
+        top = self.origin[1] + self.pad + self.id_pad
+        self.board_rect = pygame.Rect(left, top, 8 * side, 8 * side)
+        self.squares_rects = tuple(pygame.Rect(left + x * side, top + y * side, side, side)
+                for y in range(8) for x in range(8))
+        # strip above the board where messages go
+        self.msg_rect = pygame.Rect(0, 0, size[0], max(top, 0))
+        self.msg_pos = (self.origin[0] + self.id_pad + scaled(5, side), self.origin[1] + scaled(5, side))
+        self.msg_right = self.origin[0] + width - self.pad
+
+    def pos_to_index(self, x, y):
+        if not self.board_rect.collidepoint(x, y):
+            return None
+        xfloor, yfloor = (x - self.board_rect.left) // self.side, (y - self.board_rect.top) // self.side
+        return xfloor + 8 * yfloor
 
 
 class DirMask(enum.IntFlag):
@@ -116,19 +206,18 @@ class DirMask(enum.IntFlag):
 
 class UI():
     def __init__(self):
-        self.size = (
-                8*SQUARE_SIZE[0] + 2*PAD + 2*ID_PAD,
-                8*SQUARE_SIZE[1] + 2*PAD + 2*ID_PAD,
-                )
-        self.display = pygame.display.set_mode(self.size)
-        self.display.fill(BG_COLOR)
+        _init_pygame()
+        self.display = pygame.display.set_mode(board_size(SQUARE_SIZE[0]), pygame.RESIZABLE)
         self.dirty = True
-        self.clock = pygame.time.Clock()
-        self.fps = 120
+        # dirty-rect rendering: a pre-rendered static board and what is currently shown per square
+        self.background = None
+        self.full_redraw = True
+        self.shown = [None] * 64          # (code, selected, cursor) last drawn on each square
+        self.msgs_shown = None            # (error, engine) messages last drawn
+        self.drag_rect = None             # where the drag ghost was last drawn
+        self.resize(self.display.get_size())
 
         self.dirmask = DirMask(0)     # mask for directions (has all directions)
-        self.dirtime = None           # direction time (when direction key first pressed)
-        self.dirtime_repeat = None    # direction time repeat (when dir key repeated)
         self.cursor = 52              # cursor (E2)
         self.sel_ind = None       # selected square
         self.board = chess.Board()    # chess board
@@ -139,33 +228,46 @@ class UI():
         self.ignore_mouseup = False   # should ignore next mouseup event
         self.draw_cursor = True       # do blit cursor (turn off if only mouse events used)
         self.error_msg = None         # used to display error messages
-
-        # cursor surf
-        vsurf = pygame.Surface((CURSOR_PAD, SQUARE_SIZE[1]))
-        vsurf.fill(CURSOR_COLOR)
-        hsurf = pygame.Surface((SQUARE_SIZE[0] - 2 * CURSOR_PAD, CURSOR_PAD))
-        hsurf.fill(CURSOR_COLOR)
-        self.cursor_surf = pygame.Surface(SQUARE_SIZE)
-        self.cursor_surf.set_colorkey((0, 0, 0))
-        self.cursor_surf.blit(vsurf, (0, 0))
-        self.cursor_surf.blit(vsurf, (SQUARE_SIZE[0] - CURSOR_PAD, 0))
-        self.cursor_surf.blit(hsurf, (CURSOR_PAD, 0))
-        self.cursor_surf.blit(hsurf, (CURSOR_PAD, SQUARE_SIZE[1] - CURSOR_PAD))
+        self.worker = None            # background engine process (started on first use)
+        self.analyzing = False        # stream engine analysis of the current position
+        self.computer = None          # color played by the computer
+        self.engine_msg = None        # latest engine depth/score/pv line
 
     def mainloop(self):
+        # sleep until something happens: input, a key repeat or an engine poll timer
         running = True
         while running:
-            for event in pygame.event.get():
-                running &= self.onevent(event)
+            running = self.onevent(pygame.event.wait())
             if self.dirty:
                 self.onrender()
                 self.dirty = False
-            self.clock.tick(self.fps)
+
+    def resize(self, size):
+        """ lay the board out for a window of `size`, with the largest squares that fit """
+        self.size = size
+        self.layout = Layout(size, square_side(size))
+        self.assets = get_assets(self.layout.side)
+        self.background = None
+        self.dirty = True
 
     def onevent(self, event):
         if event.type == pygame.QUIT:
             return False
-        if event.type == pygame.KEYDOWN:
+        if event.type == pygame.VIDEOEXPOSE:
+            self.full_redraw = True
+            self.dirty = True
+        elif event.type == pygame.VIDEORESIZE:
+            # only the last of a burst of resize events matters
+            size = event.size
+            for later in pygame.event.get(pygame.VIDEORESIZE):
+                size = later.size
+            self.display = pygame.display.get_surface()
+            self.resize(size)
+        elif event.type == REPEAT_EVENT:
+            self.repeat()
+        elif event.type == ENGINE_EVENT:
+            self.poll_engine()
+        elif event.type == pygame.KEYDOWN:
             self.keydown(event)
         elif event.type == pygame.KEYUP:
             self.keyup(event)
@@ -182,7 +284,6 @@ class UI():
         key = event.key
         dirty = False
         if key == pygame.K_SPACE:
-            # TODO: dirtyRects
             dirty = True
             if self.sel_ind:
                 if self.sel_ind != self.cursor:
@@ -190,6 +291,15 @@ class UI():
                 self.sel_ind = None
             elif self.board[self.cursor] is not None:
                 self.sel_ind = self.cursor
+        elif key == ANALYZE_KEY:
+            dirty = True
+            self.analyzing = not self.analyzing
+            self.engine_msg = None
+            self.think()
+        elif key == COMPUTER_KEY:
+            dirty = True
+            self.computer = None if self.computer is not None else self.board.turn
+            self.think()
         elif key in UP_KEYS:
             self.dirmask |= DirMask.UP
             self.dirmask &= ~DirMask.DOWN
@@ -202,9 +312,11 @@ class UI():
         elif key in LEFT_KEYS:
             self.dirmask |= DirMask.LEFT
             self.dirmask &= ~DirMask.RIGHT
-        dirty |= bool(self.dirmask)
-        if not dirty:
-            self.dirtime = None
+        if key in UP_KEYS + RIGHT_KEYS + DOWN_KEYS + LEFT_KEYS:
+            dirty = True
+            self.move_cursor()
+            # first repeat after REPEAT_DELAY, see repeat()
+            pygame.time.set_timer(REPEAT_EVENT, int(REPEAT_DELAY * 1000))
         self.dirty = dirty
 
     def trymove(self, from_ind, to_ind):
@@ -212,8 +324,49 @@ class UI():
         if self.board.error:
             self.error_msg = self.board.error_msg
         else:
-            self.error_msg = None
+            self.error_msg = self.draw_msg()
+            # the position changed: drop whatever the engine was doing
+            self.think()
 
+    def draw_msg(self):
+        """ message when a draw can be claimed in the current position """
+        if self.board.is_repetition(3):
+            return "Draw can be claimed: threefold repetition"
+        if self.board.is_fifty_moves():
+            return "Draw can be claimed: fifty-move rule"
+        return None
+
+    def think(self):
+        """ (re)start the background engine for the current position, or cancel it """
+        if self.computer is None and not self.analyzing:
+            if self.worker is not None:
+                self.worker.cancel()
+            return
+        if self.worker is None:
+            self.worker = EngineWorker()
+        if self.computer == self.board.turn:
+            self.worker.start(self.board, movetime=ENGINE_MOVETIME)
+        elif self.analyzing:
+            self.worker.start(self.board)
+        else:
+            self.worker.cancel()
+            return
+        # poll_engine() stops the timer once the search is over
+        pygame.time.set_timer(ENGINE_EVENT, int(ENGINE_POLL * 1000))
+
+    def poll_engine(self):
+        for kind, result in self.worker.poll():
+            self.dirty = True
+            if result.move is not None:
+                self.engine_msg = "depth {} {} {}".format(result.depth, format_score(result),
+                        " ".join(move.uci() for move in result.pv[:4]))
+            if kind == "bestmove" and result.move is not None and self.computer == self.board.turn:
+                self.board.push(result.move)
+                self.sel_ind = None
+                self.error_msg = self.draw_msg()
+                self.think()
+        if not self.worker.busy:
+            pygame.time.set_timer(ENGINE_EVENT, 0)
 
     def keyup(self, event):
         dirty = False
@@ -228,14 +381,13 @@ class UI():
             self.dirmask &= ~DirMask.DOWN
         elif key in LEFT_KEYS:
             self.dirmask &= ~DirMask.LEFT
-        dirty |= bool(self.dirmask)
-        if not dirty:
-            self.dirtime = None
+        if not self.dirmask:
+            pygame.time.set_timer(REPEAT_EVENT, 0)
         self.dirty = dirty
 
     def mousedown(self, event):
         self.dragging = False
-        index = pos_to_index(*event.pos)
+        index = self.layout.pos_to_index(*event.pos)
         if index is None:
             self.dirty = False
             return
@@ -245,7 +397,7 @@ class UI():
         if p is not None:
             self.dragpiece = p
             x, y = event.pos
-            self.dragpos = (x - SQUARE_SIZE[0] // 2, y - SQUARE_SIZE[1] // 2)
+            self.dragpos = (x - self.layout.side // 2, y - self.layout.side // 2)
             self.piecemoved = False
             self.dirty = True
             return
@@ -255,13 +407,13 @@ class UI():
         if self.dragpos:
             self.dragging = True
             self.double_select = False
-            index = pos_to_index(*event.pos)
+            index = self.layout.pos_to_index(*event.pos)
             if index is None:
                 self.dirty = False
                 return
             cursor = index
             x, y = event.pos
-            self.dragpos = (x - SQUARE_SIZE[0] // 2, y - SQUARE_SIZE[1] // 2)
+            self.dragpos = (x - self.layout.side // 2, y - self.layout.side // 2)
             if cursor != self.cursor:
                 self.piecemoved = True
             self.dirty = True
@@ -271,7 +423,7 @@ class UI():
     def mouseup(self, event):
         self.dragging = False
         x, y = event.pos
-        newpos = (x - SQUARE_SIZE[0] // 2, y - SQUARE_SIZE[1] // 2)
+        newpos = (x - self.layout.side // 2, y - self.layout.side // 2)
         if event.pos != newpos:
             self.dragpos = event.pos
             self.ignore_mouseup = False
@@ -287,7 +439,7 @@ class UI():
         if self.ignore_mouseup:
             self.ignore_mouseup = False
         else:
-            index = pos_to_index(*event.pos)
+            index = self.layout.pos_to_index(*event.pos)
             if index is None:
                 self.dragpos = None
                 self.dragpiece = None
@@ -307,76 +459,116 @@ class UI():
                 self.sel_ind = None
         self.dirty = True
 
+    def repeat(self):
+        """ held direction keys: move the cursor again every REPEAT_WAIT """
+        if not self.dirmask:
+            # a timer event that was already queued when the keys were released
+            return
+        self.move_cursor()
+        self.dirty = True
+        pygame.time.set_timer(REPEAT_EVENT, int(REPEAT_WAIT * 1000))
+
+    def move_cursor(self):
+        inc = 0
+        if DirMask.UP in self.dirmask:
+            if self.cursor // 8 > 0:
+                inc += -8
+        if DirMask.RIGHT in self.dirmask:
+            if self.cursor % 8 < 7:
+                inc += 1
+        if DirMask.DOWN in self.dirmask:
+            if self.cursor // 8 < 7:
+                inc += 8
+        if DirMask.LEFT in self.dirmask:
+            if self.cursor % 8 > 0:
+                inc += -1
+        self.cursor = self.cursor + inc
+
     def onrender(self):
-        if self.dirmask:
-            move = False
-            t = time.time()
-            if self.dirtime is None:
-                move = True
-                self.dirtime = t
-                self.dirtime_repeat = self.dirtime
-            elif t - self.dirtime > REPEAT_DELAY:
-                if t - self.dirtime_repeat > REPEAT_WAIT:
-                    self.dirtime_repeat = t
-                    move = True
-            if move:
-                inc = 0
-                if DirMask.UP in self.dirmask:
-                    if self.cursor // 8 > 0:
-                        inc += -8
-                if DirMask.RIGHT in self.dirmask:
-                    if self.cursor % 8 < 7:
-                        inc += 1
-                if DirMask.DOWN in self.dirmask:
-                    if self.cursor // 8 < 7:
-                        inc += 8
-                if DirMask.LEFT in self.dirmask:
-                    if self.cursor % 8 > 0:
-                        inc += -1
-                if inc:
-                    # TODO: dirtyRects (much lighter rendering)
-                    self.cursor = self.cursor + inc
-        # draw board
-        self.display.fill(BG_COLOR)
-        for i, txt in enumerate(ID_RANKS):
-            x, y = SQUARES_RECTS[i * 8].topleft
-            x -= ID_PAD - 2
-            y += 12
-            self.display.blit(txt, (x, y))
-        for i, txt in enumerate(ID_FILES):
-            x, y = SQUARES_RECTS[i + 56].bottomleft
-            y += 2
-            x += 17
-            self.display.blit(txt, (x, y))
-        if self.error_msg:
-            errmsg = MSG_FONT.render(self.error_msg, True, FONT_COLOR)
-            self.display.blit(errmsg, (ID_PAD + 5, 5))
-        for i, p in enumerate(self.board):
-            sr = SQUARES_RECTS[i]
-            square = SQUARES[(i // 8) % 2 != i % 2]
-            self.display.blit(square, sr)
-            sel_sr = SQUARES_RECTS[self.sel_ind] if i == self.sel_ind else None
-            if p is not None:
-                if sel_sr:
-                    # draw transparent ghost piece
-                    self.display.blit(PIECES[p], sr)
-                    # draw select background
-                    self.display.blit(SELECTED, sr)
-                else:
-                    # draw normal piece
-                    self.display.blit(PIECES[p], sr)
-        if self.draw_cursor:
-            x, y = self.cursor // 8, self.cursor % 8
-            self.display.blit(CURSOR, SQUARES_RECTS[self.cursor])
+        rects = []
+        if self.background is None:
+            self.background = self._render_background()
+            self.full_redraw = True
+        if self.full_redraw:
+            self.display.blit(self.background, (0, 0))
+            self.shown = [None] * 64
+            self.msgs_shown = None
+            self.drag_rect = None
+        # restore what the drag ghost covered last frame
+        if self.drag_rect is not None:
+            self.display.blit(self.background, self.drag_rect, self.drag_rect)
+            rects.append(self.drag_rect)
+            for i, sr in enumerate(self.layout.squares_rects):
+                if sr.colliderect(self.drag_rect):
+                    self.shown[i] = None
+            if self.drag_rect.colliderect(self.layout.msg_rect):
+                self.msgs_shown = None
+            self.drag_rect = None
+        # message strip above the board
+        msgs = (self.error_msg, self.engine_msg if self.analyzing or self.computer is not None else None)
+        if msgs != self.msgs_shown:
+            self.display.blit(self.background, self.layout.msg_rect, self.layout.msg_rect)
+            if msgs[0]:
+                errmsg = self.assets.msg_font.render(msgs[0], True, FONT_COLOR)
+                self.display.blit(errmsg, self.layout.msg_pos)
+            if msgs[1]:
+                engmsg = self.assets.msg_font.render(msgs[1], True, FONT_COLOR)
+                self.display.blit(engmsg, (self.layout.msg_right - engmsg.get_width(), self.layout.msg_pos[1]))
+            rects.append(self.layout.msg_rect)
+            self.msgs_shown = msgs
+        # squares whose piece, selection or cursor changed
+        cursor = self.cursor if self.draw_cursor else None
+        for i, code in enumerate(self.board.mailbox):
+            state = (code, bool(code) and i == self.sel_ind, i == cursor)
+            if state != self.shown[i]:
+                self._render_square(i, *state)
+                rects.append(self.layout.squares_rects[i])
+                self.shown[i] = state
         # draw drag piece
         if self.dragpos and self.dragging:
-            self.display.blit(GHOSTS[self.dragpiece], self.dragpos)
-        # if self.dirmask:
-        pygame.display.flip()
+            self.drag_rect = self.display.blit(self.assets.ghosts[self.dragpiece], self.dragpos)
+            rects.append(self.drag_rect)
+        if self.full_redraw:
+            pygame.display.flip()
+            self.full_redraw = False
+        elif rects:
+            pygame.display.update(rects)
+
+    def _render_background(self):
+        """ everything that doesn't change: background, rank and file labels and empty squares """
+        surf = pygame.Surface(self.size).convert()
+        surf.fill(BG_COLOR)
+        side = self.layout.side
+        for i, txt in enumerate(self.assets.ranks):
+            x, y = self.layout.squares_rects[i * 8].topleft
+            x -= self.layout.id_pad - scaled(2, side)
+            y += scaled(12, side)
+            surf.blit(txt, (x, y))
+        for i, txt in enumerate(self.assets.files):
+            x, y = self.layout.squares_rects[i + 56].bottomleft
+            y += scaled(2, side)
+            x += scaled(17, side)
+            surf.blit(txt, (x, y))
+        for i, sr in enumerate(self.layout.squares_rects):
+            surf.blit(self.assets.squares[(i // 8) % 2 != i % 2], sr)
+        return surf
+
+    def _render_square(self, i, code, selected, cursor):
+        sr = self.layout.squares_rects[i]
+        self.display.blit(self.background, sr, sr)
+        if code:
+            self.display.blit(self.assets.pieces[self.board[i]], sr)
+            if selected:
+                # draw select background
+                self.display.blit(self.assets.selected, sr)
+        if cursor:
+            self.display.blit(self.assets.cursor, sr)
 
 def main():
     ui = UI()
     ui.mainloop()
+    if ui.worker is not None:
+        ui.worker.close()
     pygame.quit()
 
 if __name__ == "__main__":
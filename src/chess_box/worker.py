@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+""" engine searches in a background process
+
+EngineWorker keeps an Engine in a separate process, so a front end (the pygame UI) keeps its
+frame rate while the engine thinks. Searches are started with start(), their iterations and
+final result are streamed back and collected with poll(), and cancel() stops the current one.
+Every search has an id; results of cancelled or superseded searches are dropped.
+"""
+
+import multiprocessing
+import queue
+
+from chess_box.engine import Engine
+
+class _Cancelled():
+    """ Engine.stop_event for search `search_id`: set once cancel() reached that id """
+    def __init__(self, cancelled, search_id):
+        self.cancelled = cancelled
+        self.search_id = search_id
+
+    def is_set(self):
+        return self.cancelled.value >= self.search_id
+
+def _run(requests, updates, cancelled, tt_mb):
+    engine = Engine(tt_mb)
+    while True:
+        request = requests.get()
+        # only the newest request matters; older ones were superseded while we were busy
+        try:
+            while request is not None:
+                request = requests.get_nowait()
+        except queue.Empty:
+            pass
+        if request is None:
+            return
+        search_id, board, limits = request
+        engine.stop_event = _Cancelled(cancelled, search_id)
+        if engine.stop_event.is_set():
+            continue
+
+        def info(result):
+            updates.put((search_id, "info", result))
+        result = engine.search(board, info=info, **limits)
+        updates.put((search_id, "bestmove", result))
+
+class EngineWorker():
+    def __init__(self, tt_mb=16):
+        # spawn, so the child does not inherit the parent's display/audio state (e.g. pygame)
+        context = multiprocessing.get_context("spawn")
+        self.requests = context.Queue()
+        self.updates = context.Queue()
+        self.cancelled = context.Value("q", 0)
+        self.search_id = 0
+        self.process = context.Process(target=_run, daemon=True,
+                args=(self.requests, self.updates, self.cancelled, tt_mb))
+        self.process.start()
+
+    def start(self, board, depth=None, nodes=None, movetime=None):
+        """ cancel the current search and search a copy of `board`; returns the new search id """
+        self.cancel()
+        self.search_id += 1
+        self.requests.put((self.search_id, board, dict(depth=depth, nodes=nodes, movetime=movetime)))
+        return self.search_id
+
+    def cancel(self):
+        """ stop the current search; its remaining updates are dropped """
+        with self.cancelled.get_lock():
+            self.cancelled.value = self.search_id
+
+    @property
+    def busy(self):
+        return self.cancelled.value < self.search_id
+
+    def poll(self):
+        """ (kind, SearchResult) updates of the current search received so far; kind is "info" or "bestmove" """
+        updates = []
+        while True:
+            try:
+                search_id, kind, result = self.updates.get_nowait()
+            except queue.Empty:
+                return updates
+            if search_id == self.search_id and search_id > self.cancelled.value:
+                updates.append((kind, result))
+                if kind == "bestmove":
+                    # finished; nothing left to cancel
+                    self.cancel()
+
+    def close(self):
+        self.cancel()
+        self.requests.put(None)
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.terminate()
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+""" run the tests against src/ without installing the package """
+
+import pathlib
+import sys
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent / "src"))
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from chess_box import chess
+from chess_box.batch import BoardBatch
+from chess_box.chess import CODE_INDICES, KING
+from chess_box.perft import REFERENCE_POSITIONS
+
+
+@pytest.fixture(scope="module")
+def boards():
+    """ the reference positions and every position one ply after them """
+    boards = []
+    for _, fen, _ in REFERENCE_POSITIONS:
+        board = chess.Board.from_fen(fen)
+        boards.append(board)
+        for move in board.legal_moves():
+            board.push(move)
+            boards.append(chess.Board.from_fen(board.fen()))
+            board.pop()
+    return boards
+
+
+def test_from_fens_matches_from_boards(boards):
+    by_fen = BoardBatch.from_fens([board.fen() for board in boards])
+    by_board = BoardBatch.from_boards(boards)
+    assert len(by_fen) == len(boards)
+    assert (by_fen.masks == by_board.masks).all()
+    assert (by_fen.turn == by_board.turn).all()
+
+
+def test_in_check(boards):
+    batch = BoardBatch.from_boards(boards)
+    assert batch.in_check().tolist() == [board.in_check() for board in boards]
+    assert any(board.in_check() for board in boards)
+
+
+def test_attacks(boards):
+    batch = BoardBatch.from_boards(boards)
+    for color in (chess.Color.LIGHT, chess.Color.DARK):
+        attacks = batch.attacks(color)
+        for board, mask in zip(boards, attacks):
+            expected = sum(1 << bit for bit in range(64) if board.is_square_attacked(bit, color))
+            assert int(mask) == expected
+
+
+def test_targets(boards):
+    batch = BoardBatch.from_boards(boards)
+    targets = batch.targets()
+    union = batch.target_mask()
+    for i, board in enumerate(boards):
+        rows = [0] * 6
+        for move in board.pseudo_legal_moves():
+            rows[CODE_INDICES[board.mailbox[move.from_bit]][1] - KING] |= 1 << move.to_bit
+        assert [int(row) for row in targets[:, i]] == rows
+        mask = 0
+        for row in rows:
+            mask |= row
+        assert int(union[i]) == mask
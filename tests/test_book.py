@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+import random
+
+import pytest
+
+from chess_box import book, chess
+
+# keys from the Polyglot format specification
+KEYS = [
+    ([], 0x463b96181691fc9c),
+    (["e2e4"], 0x823c9b50fd114196),
+    (["e2e4", "d7d5"], 0x0756b94461c50fb0),
+    (["e2e4", "d7d5", "e4e5"], 0x662fafb965db29d4),
+    (["e2e4", "d7d5", "e4e5", "f7f5"], 0x22a48b5a8e47ff78),
+    (["e2e4", "d7d5", "e4e5", "f7f5", "e1e2"], 0x652a607ca3f242c1),
+    (["e2e4", "d7d5", "e4e5", "f7f5", "e1e2", "e8f7"], 0x00fdd303c946bdd9),
+    (["a2a4", "b7b5", "h2h4", "b5b4", "c2c4"], 0x3c8123ea7b067637),
+]
+
+
+def play(moves, board=None):
+    board = board or chess.Board()
+    for text in moves:
+        board.push(chess.Move.from_uci(text))
+    return board
+
+
+@pytest.mark.parametrize("moves, key", KEYS)
+def test_polyglot_key(moves, key):
+    assert book.polyglot_key(play(moves)) == key
+
+
+def encode(move):
+    """ Polyglot 16-bit move for "e2e4"-style text (rows count from rank 1) """
+    files = "abcdefgh"
+    from_file, from_row = files.index(move[0]), int(move[1]) - 1
+    to_file, to_row = files.index(move[2]), int(move[3]) - 1
+    promotion = " nbrq".index(move[4]) if len(move) > 4 else 0
+    return promotion << 12 | from_row << 9 | from_file << 6 | to_row << 3 | to_file
+
+
+def write_book(path, positions):
+    entries = []
+    for board, moves in positions:
+        key = book.polyglot_key(board)
+        entries += [(key, encode(move), weight, 0) for move, weight in moves]
+    # another position's entries, to be skipped by the search
+    entries.append((1, encode("a2a3"), 5, 0))
+    entries.sort(key=lambda entry: entry[0])
+    with open(path, "wb") as f:
+        for entry in entries:
+            f.write(book.ENTRY.pack(*entry))
+
+
+def test_book_round_trip(tmp_path):
+    start = chess.Board()
+    castles = chess.Board.from_fen("r3k2r/pppppppp/8/8/8/8/PPPPPPPP/R3K2R w KQkq - 0 1")
+    path = tmp_path / "test.bin"
+    write_book(path, [
+        (start, [("e2e4", 10), ("d2d4", 30), ("g1f3", 0)]),
+        # castling is stored as the king taking its own rook
+        (castles, [("e1h1", 7), ("e1a1", 3), ("h2h3", 0)]),
+    ])
+    with book.Book(path) as opening:
+        assert len(opening) == 7
+        assert opening.moves(start) == [(chess.Move.from_uci("d2d4"), 30),
+                (chess.Move.from_uci("e2e4"), 10), (chess.Move.from_uci("g1f3"), 0)]
+        entries = opening.entries(castles)
+        assert [entry.move.uci() for entry in entries] == ["e1g1", "e1c1", "h2h3"]
+        assert [entry.weight for entry in entries] == [7, 3, 0]
+        rng = random.Random(1)
+        picks = {opening.choice(start, rng).uci() for _ in range(200)}
+        assert picks == {"d2d4", "e2e4"}
+        assert opening.choice(play(["e2e4"]), rng) is None
+        assert opening.moves(play(["e2e4"])) == []
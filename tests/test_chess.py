@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from chess_box import chess
+
+
+def play(board, *moves):
+    for text in moves:
+        move = chess.Move.from_uci(text)
+        assert move in board.legal_moves()
+        board.push(move)
+    return board
+
+
+def test_repetition_after_double_pawn_push():
+    # 1.e4 e5 2.Nf3 Nc6 3.Ng1 Nb8 4.Nf3 Nc6 5.Ng1 Nb8: e6 can't be taken en passant
+    board = play(chess.Board(), "e2e4", "e7e5",
+            "g1f3", "b8c6", "f3g1", "c6b8", "g1f3", "b8c6", "f3g1", "c6b8")
+    assert board.repetitions() == 3
+    assert board.is_repetition(3)
+    assert board.can_claim_draw()
+    assert board.zobrist == board.zobrist_hash()
+
+
+def test_capturable_en_passant_keeps_positions_apart():
+    board = play(chess.Board(), "e2e4", "a7a6", "e4e5", "d7d5")
+    with_ep = board.zobrist
+    assert with_ep == board.zobrist_hash()
+    play(board, "g1f3", "g8f6", "f3g1", "f6g8")
+    assert board.zobrist != with_ep
+    assert board.zobrist == board.zobrist_hash()
+    assert board.repetitions() == 1
+    while board.states:
+        board.pop()
+    assert board.zobrist == chess.Board().zobrist
+
+
+def test_fen_epd_operations_instead_of_clocks(tmp_path):
+    path = tmp_path / "test.epd"
+    path.write_text(
+        "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - bm Bb5; id \"ruy\";\n"
+        "4k3/8/8/8/8/8/8/4K3 b - - 12 40\n")
+    first, second = (board.copy() for board in chess.iter_fens(path))
+    assert (first.halfmove_clock, first.fullmove) == (0, 1)
+    assert first.fen() == "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 0 1"
+    assert (second.halfmove_clock, second.fullmove) == (12, 40)
+
+
+def test_fen_rejects_bad_ranks_and_ep_square():
+    for fen in ("ppppppppp/7/8/8/8/8/8/4K2k w - - 0 1",
+            "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPP/RNBQKBNR w KQkq - 0 1",
+            "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP w KQkq - 0 1"):
+        with pytest.raises(ValueError, match="rank|ranks"):
+            chess.Board.from_fen(fen)
+    with pytest.raises(ValueError, match="en passant square 'e9'"):
+        chess.Board.from_fen("rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e9 0 1")
+
+
+def test_valid_move_castling_needs_rook_on_its_corner():
+    board = chess.Board.from_fen("4k3/8/8/8/8/8/8/R3K3 w KQkq - 0 1")
+    # rights alone aren't enough: kingside has no rook
+    board.castling = 0b1111
+    for fen_board in (board, chess.Board.from_fen("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1")):
+        legal = {(move.from_bit, move.to_bit) for move in fen_board.legal_moves()}
+        for to_bit in (58, 62):
+            assert fen_board.valid_move(60, to_bit) == ((60, to_bit) in legal)
+    assert not board.valid_move(60, 62)
+    assert board.valid_move(60, 58)
+
+
+def test_fen_drops_unsupported_castling_and_checks_ep_rank():
+    assert chess.Board.from_fen("4k3/8/8/8/8/8/8/4K3 w KQkq - 0 1").castling == 0
+    board = chess.Board.from_fen("r3k3/8/8/8/8/8/8/4K2R w KQkq - 0 1")
+    assert board.fen().split()[2] == "Kq"
+    assert chess.Board().castling == 0b1111
+    with pytest.raises(ValueError, match="6th rank"):
+        chess.Board.from_fen("rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR w KQkq e3 0 1")
+    with pytest.raises(ValueError, match="3rd rank"):
+        chess.Board.from_fen("rnbqkbnr/pppp1ppp/8/4p3/8/8/PPPPPPPP/RNBQKBNR b KQkq e6 0 1")
+    assert chess.Board.from_fen("rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1").ep_bit == 44
+
+
+def test_castle_is_read_only():
+    board = chess.Board()
+    assert board.castle == {chess.Color.LIGHT: 0b11, chess.Color.DARK: 0b11}
+    with pytest.raises(TypeError):
+        board.castle[chess.Color.LIGHT] = 0
+    assert board.castling == 0b1111
+    board.castle = {chess.Color.LIGHT: 0b01, chess.Color.DARK: 0}
+    assert board.castling == 0b0001
+    assert board.castle[chess.Color.LIGHT] == 0b01
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+
+from chess_box import chess
+from chess_box.engine import Engine
+
+
+def test_order_least_valuable_attacker_first():
+    # pawn and queen can both take the pawn on d5
+    board = chess.Board.from_fen("4k3/8/8/3p4/4P3/8/8/3QK3 w - - 0 1")
+    engine = Engine(1)
+    ordered = [move.uci() for move in engine._order(board, board.legal_moves(), None, 0)]
+    assert ordered.index("e4d5") < ordered.index("d1d5")
+    assert ordered[:2] == ["e4d5", "d1d5"]
+
+
+def test_node_limit_is_exact():
+    for limit in (1, 100, 1500):
+        result = Engine(1).search(chess.Board(), nodes=limit)
+        assert result.nodes <= limit
+        assert result.move is not None
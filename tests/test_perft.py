@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from chess_box import perft
+
+
+@pytest.mark.parametrize("name, fen, counts", perft.REFERENCE_POSITIONS,
+        ids=[name for name, _, _ in perft.REFERENCE_POSITIONS])
+def test_reference_positions(name, fen, counts):
+    for depth in (1, 2):
+        nodes, _ = perft.perft(fen, depth)
+        assert nodes == counts[depth - 1]
+
+
+def test_divide_sums_to_perft():
+    name, fen, counts = perft.REFERENCE_POSITIONS[1]
+    divide, _ = perft.perft_divide(fen, 2)
+    assert len(divide) == counts[0]
+    assert sum(divide.values()) == counts[1]
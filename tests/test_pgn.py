@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from chess_box import chess, pgn
+from chess_box.perft import REFERENCE_POSITIONS
+
+KIWIPETE = REFERENCE_POSITIONS[1][1]
+
+GAMES = (
+    '[Event "open {}"]\n[White "a"]\n[Black "b"]\n[Result "1/2-1/2"]\n\n'
+    '1. e4 e5 2. Nf3 {{a comment}} Nc6 (2... d6 3. d4) 3. Bc4 Nf6 4. O-O Be7\n'
+    '5. d4 exd4 $1 6. e5 1/2-1/2\n',
+    '[Event "promotion {}"]\n[FEN "8/P6k/8/8/8/8/8/K7 w - - 0 1"]\n\n'
+    '1. a8=Q Kg6 2. Qe4+ Kf6 *\n',
+    '[Event "broken {}"]\n\n1. e4 e4 *\n',
+    )
+
+
+def test_parse_san():
+    board = chess.Board()
+    assert board.parse_san("Nf3").uci() == "g1f3"
+    assert board.parse_san("e4").uci() == "e2e4"
+    with pytest.raises(ValueError):
+        board.parse_san("e5")
+    with pytest.raises(ValueError):
+        board.parse_san("Zz9")
+    board = chess.Board.from_fen(KIWIPETE)
+    assert board.parse_san("O-O").uci() == "e1g1"
+    assert board.parse_san("0-0-0").uci() == "e1c1"
+    assert board.parse_san("Bxa6").uci() == "e2a6"
+    # knights on b1 and f1 both reach d2
+    board = chess.Board.from_fen("4k3/8/8/8/8/8/8/1N2KN2 w - - 0 1")
+    with pytest.raises(ValueError):
+        board.parse_san("Nd2")
+    assert board.parse_san("Nbd2").uci() == "b1d2"
+    assert board.parse_san("Nfd2+").uci() == "f1d2"
+    board = chess.Board.from_fen("3r3k/4P3/8/8/8/8/8/4K3 w - - 0 1")
+    assert board.parse_san("e8=Q+").uci() == "e7e8q"
+    assert board.parse_san("e8").uci() == "e7e8q"
+    assert board.parse_san("exd8=N").uci() == "e7d8n"
+
+
+def write_pgn(path, count):
+    with open(path, "w") as f:
+        for i in range(count):
+            f.write(GAMES[i % len(GAMES)].format(i))
+            f.write("\n")
+    return path
+
+
+def test_iter_games(tmp_path):
+    path = write_pgn(tmp_path / "games.pgn", 3)
+    games = list(pgn.iter_games(str(path)))
+    assert [game.headers["Event"] for game in games] == ["open 0", "promotion 1", "broken 2"]
+    first, promotion, broken = games
+    assert first.moves[:4] == ["e4", "e5", "Nf3", "Nc6"]
+    assert len(first.moves) == 11
+    assert first.result == "1/2-1/2"
+    assert promotion.result == "*"
+    assert promotion.replay().fen() == "8/8/5k2/8/4Q3/8/8/K7 w - - 3 3"
+    with pytest.raises(pgn.PGNError):
+        broken.replay()
+    with open(path, "rb") as f:
+        f.seek(promotion.offset)
+        assert next(pgn.iter_games(f)).headers["Event"] == "promotion 1"
+
+
+def test_parallel_replay_matches_serial(tmp_path):
+    path = str(write_pgn(tmp_path / "games.pgn", 60))
+    serial = list(pgn.replay_file(path, processes=1))
+    parallel = list(pgn.replay_file(path, processes=2))
+    assert len(serial) == 60
+    assert parallel == serial
+    assert [result.offset for result in serial] == [game.offset for game in pgn.iter_games(path)]
+    errors = [result for result in serial if result.error]
+    assert len(errors) == 20
+    assert all(result.headers["Event"].startswith("broken") for result in errors)
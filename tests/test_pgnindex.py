@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+
+import random
+
+from chess_box import pgnindex
+
+
+def test_filter_matches_scan(tmp_path):
+    rng = random.Random(1)
+    names = ["Tal", "Petrosian", "Smyslov", "Botvinnik", "Spassky"]
+    results = ["1-0", "0-1", "1/2-1/2"]
+    path = tmp_path / "games.pgn"
+    with open(path, "w") as f:
+        for _ in range(60):
+            f.write('[White "{}"]\n[Black "{}"]\n[Result "{}"]\n\n1. e4 e5 *\n\n'.format(
+                rng.choice(names), rng.choice(names), rng.choice(results)))
+    index = pgnindex.PGNIndex.open(path)
+    entries = [index[n] for n in range(len(index))]
+    assert len(entries) == 60
+    for name in names:
+        for result in results:
+            expected = [n for n, entry in enumerate(entries) if entry.white == name and entry.result == result]
+            assert index.filter(White=name, Result=result) == expected
+    assert index.filter(White="Fischer") == []
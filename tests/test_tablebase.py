@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from chess_box import chess, tablebase
+from chess_box.tablebase import INVALID, LOSS
+
+
+@pytest.fixture(scope="module")
+def tables(tmp_path_factory):
+    """ KQvK and KRvK generated from scratch (about half a minute each) """
+    directory = tmp_path_factory.mktemp("tb")
+    tablebase.generate_all(directory, ["KQvK", "KRvK"])
+    with tablebase.Tablebase(directory) as tb:
+        yield tb
+
+
+@pytest.mark.parametrize("name, win, loss", [("KQvK", 19, 20), ("KRvK", 31, 32)])
+def test_longest_mates(tables, name, win, loss):
+    # KQvK mates in at most 10 moves, KRvK in at most 16
+    values = bytes(tables._table(name))
+    assert max(value for value in values if value < LOSS) == win
+    assert max(value - LOSS for value in values if LOSS <= value < INVALID) == loss
+
+
+@pytest.mark.parametrize("fen, probe", [
+    ("7k/8/6K1/8/8/8/8/1Q6 w - - 0 1", (1, 1)),
+    ("1Q5k/8/6K1/8/8/8/8/8 b - - 0 1", (-1, 0)),
+    ("7k/5Q2/6K1/8/8/8/8/8 b - - 0 1", (0, None)),
+    ("8/8/8/3k4/8/8/8/KQ6 w - - 0 1", (1, 17)),
+    ("7k/8/6K1/8/8/8/8/R7 w - - 0 1", (1, 1)),
+    ("k7/1R6/1K6/8/8/8/8/8 b - - 0 1", (0, None)),
+    # the piece is dark's: answered from the same table, flipped
+    ("r7/8/8/8/8/6k1/8/7K b - - 0 1", (1, 1)),
+    ("6k1/8/8/8/8/8/8/4K2R w K - 0 1", None),
+    ("8/8/8/3k4/8/8/8/KB6 w - - 0 1", None),
+    ])
+def test_probe(tables, fen, probe):
+    assert tables.probe(chess.Board.from_fen(fen)) == probe
+
+
+def test_probe_agrees_with_one_ply_search(tables):
+    board = chess.Board.from_fen("8/8/8/8/4k3/8/8/R3K3 w - - 0 1")
+    result = tables.probe(board)
+    assert result.wdl == 1
+    replies = []
+    for move in board.legal_moves():
+        board.push(move)
+        reply = tables.probe(board)
+        board.pop()
+        if reply is not None:
+            replies.append(reply)
+    assert min(reply.plies for reply in replies if reply.wdl == -1) + 1 == result.plies